@@ -0,0 +1,66 @@
+import json
+import tempfile
+from shutil import rmtree
+from datetime import datetime
+from dataclasses import replace
+from system_files.simulator import Simulator
+
+
+# run short pilot sessions of the input species with each number of threads and slice length
+# and measure model seconds simulated per wall second, return the measurements fastest first
+# as [{'number_of_parallel_threads': n, 'slice_length': s, 'throughput': t}, ...]
+def autotune(config, thread_counts, slice_lengths, pilot_time, progress_callback=None):
+    pilot_directory = tempfile.mkdtemp(prefix='autotune---', dir=config.save_results_directory)
+
+    measurements = []
+    try:
+        for n_threads in thread_counts:
+            for slice_length in slice_lengths:
+                pilot_config = replace(config,
+                                       number_of_parallel_threads=n_threads,
+                                       slice_length=slice_length,
+                                       simulation_time=pilot_time,
+                                       number_of_test_suites=1,
+                                       save_results_directory=pilot_directory,
+                                       adaptive_thread_count=False,
+                                       equilibrium_detection=False,
+                                       record_replay_bundle=False,
+                                       replay_bundle=None,
+                                       save_trajectory=False,
+                                       write_results_at_model_times=[])
+
+                time_start = datetime.now()
+                Simulator(pilot_config).run_suite()
+                wall_time = (datetime.now() - time_start).total_seconds()
+
+                measurement = {'number_of_parallel_threads': n_threads,
+                               'slice_length': slice_length,
+                               'throughput': round(pilot_time / wall_time, 6)}
+                measurements.append(measurement)
+
+                if progress_callback is not None:
+                    progress_callback(measurement)
+    finally:
+        rmtree(pilot_directory, ignore_errors=True)
+
+    return sorted(measurements, key=lambda m: m['throughput'], reverse=True)
+
+
+# throughput measured per number of threads at the given slice length, used to re-tune the number of threads
+# per step, so the numbers of threads are compared at the slice length the session runs with
+def get_thread_count_throughput(measurements, slice_length):
+    return {str(m['number_of_parallel_threads']): m['throughput'] for m in measurements
+            if m['slice_length'] == slice_length}
+
+
+# write the fastest settings back to the simulation parameters file, other parameters are kept as they are
+def write_back_parameters(parameters_file, measurements):
+    with open(parameters_file) as f:
+        parameters = json.load(f)
+
+    parameters['number_of_parallel_threads'] = measurements[0]['number_of_parallel_threads']
+    parameters['slice_length'] = measurements[0]['slice_length']
+    parameters['thread_count_throughput'] = get_thread_count_throughput(measurements, measurements[0]['slice_length'])
+
+    with open(parameters_file, 'w') as f:
+        json.dump(parameters, f, indent=1)
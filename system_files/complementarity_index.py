@@ -0,0 +1,62 @@
+import re
+from collections import Counter
+
+# nucleotide agent of a species complex, e.g. N(b~A,5!1,3!2,W) or N(b~A,5,3!2,W!1)
+nucleotide_syntax = re.compile(r'N\(b~([ATCG]),5(?:!(\d+))?,3(?:!(\d+))?,W(?:!(\d+))?')
+
+complement = {'A': 'T', 'T': 'A', 'C': 'G', 'G': 'C'}
+
+# length of the complementary segments bound by the binding rules at reaction_rules.bngl
+kmer_length = 3
+
+
+# return reverse compliment of a segment, i.e. the segment which binds to it, both read 5' - 3'
+def reverse_complement(segment):
+    return ''.join([complement[b] for b in reversed(segment)])
+
+
+# split a complex to its ssDNA strands, each strand as a list of [base, W bound] read 5' - 3'
+def get_strands(complex):
+    nucleotides = [nucleotide_syntax.match(n).groups() for n in complex.split('.')]
+
+    # 5' bond label of a nucleotide to it's index, to follow the strand from 5' to 3' end
+    five_bonds = {n[1]: i for i, n in enumerate(nucleotides) if n[1] is not None}
+
+    strands = []
+    for n in nucleotides:
+        if n[1] is None:
+            strand, current = [], n
+            while current is not None:
+                strand.append([current[0], current[3] is not None])
+                current = nucleotides[five_bonds[current[2]]] if current[2] is not None else None
+            strands.append(strand)
+
+    return strands
+
+
+# count the free (W unbound) segments of length k of a complex, read 5' - 3'
+def get_free_kmers(complex, k=kmer_length):
+    kmers = Counter()
+
+    for strand in get_strands(complex):
+        for i in range(0, len(strand) - k + 1):
+            segment = strand[i:i + k]
+            if not any([s[1] for s in segment]):
+                kmers[''.join([s[0] for s in segment])] += 1
+
+    return kmers
+
+
+# add free k-mers of complexes not seen before to the index, complexes are post processed
+# so identical complexes carry the same syntax over steps and the index grows incrementally
+def update_kmer_index(kmer_index, species_set):
+    for complex in species_set:
+        if complex[0] not in kmer_index:
+            kmer_index[complex[0]] = get_free_kmers(complex[0])
+
+    return kmer_index
+
+
+# number of possible bindings between a complex and the free k-mers already put in a basket
+def binding_affinity(complex_kmers, basket_kmers):
+    return sum([n * basket_kmers[reverse_complement(kmer)] for kmer, n in complex_kmers.items()])
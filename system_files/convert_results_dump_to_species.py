@@ -1,6 +1,8 @@
 from struct import unpack
 
 # global parameters
+# fg~ state and fg bond are the last two values of a molecule, they are not decoded, complexes are told apart
+# by their complex ID (the second value), so the dumps of any fg state tagging are decoded the same way
 agents, agent, left, right, comp, sites = ['A', 'T', 'C', 'G'], 2, 5, 7, 9, 12
 nuc = {0: 'A', 1: 'T', 2: 'C', 3: 'G'}
 
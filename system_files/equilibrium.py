@@ -0,0 +1,38 @@
+from collections import deque
+from system_files.species_metrics import complex_distribution, total_variation_distance, species_observables
+
+# drift measures of the equilibrium monitor
+equilibrium_measures = ['species', 'observables']
+
+
+# largest relative change of the observables of two complex distributions
+def observables_drift(distribution_a, distribution_b):
+    observables_a = species_observables(distribution_a, 1)
+    observables_b = species_observables(distribution_b, 1)
+
+    return max([abs(observables_b[o] - v) / v if v else float(observables_b[o] != 0)
+                for o, v in observables_a.items()])
+
+
+# detect the steady state of a test suite, the drift of a step is the largest distance of it's merged canonical
+# species (or their observables) from each of the last window steps, equilibrium is reached when it is
+# below the tolerance, so slow trends which consecutive steps hide are still seen
+class EquilibriumMonitor:
+
+    def __init__(self, window, tolerance, measure='species'):
+        self.tolerance = tolerance
+        self.distance = total_variation_distance if measure == 'species' else observables_drift
+        self.window = deque(maxlen=window)
+        self.drift = None
+
+    # add a step's species set, return true if equilibrium is reached
+    def update(self, species_set):
+        distribution = complex_distribution([species_set])
+
+        # the drift is known once the window is full
+        self.drift = None
+        if len(self.window) == self.window.maxlen:
+            self.drift = max([self.distance(d, distribution) for d in self.window])
+        self.window.append(distribution)
+
+        return self.drift is not None and self.drift < self.tolerance
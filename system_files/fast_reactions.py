@@ -0,0 +1,231 @@
+from collections import Counter
+from system_files.complexes_post_processor import complexes_post_process
+from system_files.complementarity_index import nucleotide_syntax, complement
+
+# rate of the near-instant rules at reaction_rules.bngl, which are applied by the saturation pass
+fast_rate = 'k_max'
+
+# maximum number of pairs a freshly bound length-3 helix is extended by, as by the prolongation rules
+zipper_length = 2
+
+
+# deterministic saturation of the near-instant (k_max) reactions at reaction_rules.bngl, applied to
+# post processed complexes between simulation steps, so NFsim spends it's events on the slow reactions
+# - un-binding of single complementary bases (rules 8, 8+, 8++ and 8*, with the W!+ variants of 8 and 8+)
+# - zipper extension of freshly bound length-3 helices by up to 2 pairs (rules 14, prolongation)
+# as NFsim runs without complex bookkeeping, un-binding rules with '+' products are applied whether or not
+# the complex really splits, the same way as here
+# fg-fg bonds are not kept by the dumps, so helices of exactly length 3 stand for the fg flagged ones
+class Complex:
+
+    def __init__(self, syntax):
+        nucleotides = [nucleotide_syntax.match(n).groups() for n in syntax.split('.')]
+        five_bonds = {n[1]: i for i, n in enumerate(nucleotides) if n[1] is not None}
+        three_bonds = {n[2]: i for i, n in enumerate(nucleotides) if n[2] is not None}
+        w_bonds = {}
+        for i, n in enumerate(nucleotides):
+            if n[3] is not None:
+                w_bonds.setdefault(n[3], []).append(i)
+
+        self.base = [n[0] for n in nucleotides]
+        # index of the 5' neighbor, 3' neighbor and W bound partner of each nucleotide, None if not bound
+        self.five = [three_bonds[n[1]] if n[1] is not None else None for n in nucleotides]
+        self.three = [five_bonds[n[2]] if n[2] is not None else None for n in nucleotides]
+        self.w = [[j for j in w_bonds[n[3]] if j != i][0] if n[3] is not None else None
+                  for i, n in enumerate(nucleotides)]
+
+    def free(self, i):
+        return i is not None and self.w[i] is None
+
+    def bound(self, i):
+        return i is not None and self.w[i] is not None
+
+    def paired(self, i, j):
+        return i is not None and j is not None and self.w[i] == j
+
+    def non_complementary(self, i, j):
+        return complement[self.base[i]] != self.base[j]
+
+    # single base un-binding rules for nucleotide i bound to j
+    def single_unbinding(self, i, j):
+        p, n = self.five[i], self.three[i]
+
+        # 8 and 8+, bound base in the middle or at the end of a non-bound sequence
+        if (self.free(p) or p is None) and (self.free(n) or n is None) and not (p is None and n is None):
+            return True
+
+        # 8 and 8+ next to a bound base, one neighbor is bound and the other free or none, and the neighbor of the
+        # complement facing the bound one is free
+        q, m = self.three[j], self.five[j]
+        if self.bound(p) and (self.free(n) or n is None) and self.free(q):
+            return True
+        if self.bound(n) and (self.free(p) or p is None) and self.free(m):
+            return True
+
+        # 8++, the complement on the same ssDNA at distance 0 or 1
+        if j == n or (n is not None and j == self.three[n]):
+            return True
+
+        # 8*, the opposite neighbors of the pair are bound, but not complementary
+        if self.bound(p) and self.bound(q) and self.non_complementary(p, q):
+            return True
+        if self.bound(n) and self.bound(m) and self.non_complementary(n, m):
+            return True
+
+        return False
+
+    # un-bind single bases until none of the rules applies, return true if any un-bound
+    def saturate_unbinding(self):
+        changed, unbound = True, False
+        while changed:
+            changed = False
+            for i in range(0, len(self.base)):
+                j = self.w[i]
+                if j is not None and (self.single_unbinding(i, j) or self.single_unbinding(j, i)):
+                    self.w[i], self.w[j] = None, None
+                    changed, unbound = True, True
+                    break
+
+        return unbound
+
+    # helices as lists of pairs [i, j], i running 5' - 3' and j running 3' - 5'
+    def helices(self):
+        helices, seen = [], set()
+        for i in range(0, len(self.base)):
+            j = self.w[i]
+            if j is None or i in seen or self.paired(self.five[i], self.three[j]):
+                continue
+
+            helix = [[i, j]]
+            while self.paired(self.three[helix[-1][0]], self.five[helix[-1][1]]):
+                helix.append([self.three[helix[-1][0]], self.five[helix[-1][1]]])
+            seen.update([h[1] for h in helix])
+            helices.append(helix)
+
+        return helices
+
+    # extend helices of length 3 on both ends by up to zipper_length complementary free pairs
+    def saturate_zipper(self):
+        extended = False
+        for helix in self.helices():
+            if len(helix) != 3:
+                continue
+
+            for (i, j), step_i, step_j in [[helix[-1], self.three, self.five], [helix[0], self.five, self.three]]:
+                for _ in range(0, zipper_length):
+                    i, j = step_i[i], step_j[j]
+                    if not (self.free(i) and self.free(j)) or i == j or complement[self.base[i]] != self.base[j]:
+                        break
+                    self.w[i], self.w[j] = j, i
+                    extended = True
+
+        return extended
+
+    # syntax of each connected complex, e.g. N(b~A,5,3!2,W!1).N(b~T,5!2,3,W!1)
+    def components(self):
+        components, component_of = [], {}
+        for start in range(0, len(self.base)):
+            if start in component_of:
+                continue
+
+            component, queue = [], [start]
+            component_of[start] = len(components)
+            while queue:
+                i = queue.pop()
+                component.append(i)
+                for k in [self.five[i], self.three[i], self.w[i]]:
+                    if k is not None and k not in component_of:
+                        component_of[k] = len(components)
+                        queue.append(k)
+            components.append(sorted(component))
+
+        syntaxes = []
+        for component in components:
+            # bond labels keyed by the strand bond's 5' side nucleotide, or the W bound pair
+            labels = {}
+            for i in component:
+                for key in [('3', i) if self.three[i] is not None else None,
+                            ('W', min(i, self.w[i]), max(i, self.w[i])) if self.w[i] is not None else None]:
+                    if key is not None and key not in labels:
+                        labels[key] = str(len(labels) + 1)
+
+            def site(name, key):
+                return name + ('!' + labels[key] if key in labels else '')
+
+            syntaxes.append('.'.join(['N(b~{},{},{},{})'.format(
+                self.base[i],
+                site('5', ('3', self.five[i])),
+                site('3', ('3', i)),
+                site('W', ('W', min(i, self.w[i]), max(i, self.w[i])) if self.w[i] is not None else None))
+                for i in component]))
+
+        return syntaxes
+
+
+# post processed complexes formed by saturating the fast reactions of a complex, as [[syntax, count], ...]
+def saturate_complex(syntax):
+    complex = Complex(syntax)
+
+    changed = complex.saturate_unbinding()
+    if complex.saturate_zipper():
+        complex.saturate_unbinding()
+        changed = True
+
+    if not changed:
+        return [[syntax, 1]]
+
+    products = Counter(complex.components())
+
+    return [[c[0], int(c[1])] for c in complexes_post_process([p + '  ' + str(n) for p, n in products.items()],
+                                                              '', '', '')]
+
+
+# saturate the fast reactions of a post processed species set, saturation_cache keeps the products of complexes
+# seen before, return the post processed species set, e.g. [['N(b~A,5,3!1,W).N(b~T,5!1,3,W)', '10'], ...]
+def saturate_species(species_set, saturation_cache):
+    saturated = Counter()
+    for complex in species_set:
+        if complex[0] not in saturation_cache:
+            saturation_cache[complex[0]] = saturate_complex(complex[0])
+
+        for product, n in saturation_cache[complex[0]]:
+            saturated[product] += n * int(complex[1])
+
+    return [[c, str(n)] for c, n in saturated.items()]
+
+
+# complexes of each fast rule family and their saturated products, checked without NFsim
+saturation_cases = [
+    ['8', 'N(b~C,5,3!1,W).N(b~A,5!1,3!2,W!3).N(b~C,5!2,3,W).N(b~G,5,3!4,W).N(b~T,5!4,3!5,W!3).N(b~G,5!5,3,W)',
+     [['N(b~C,5,3!1,W).N(b~A,5!1,3!2,W).N(b~C,5!2,3,W)', 1], ['N(b~G,5,3!1,W).N(b~T,5!1,3!2,W).N(b~G,5!2,3,W)', 1]]],
+    ['8+', 'N(b~C,5,3!1,W).N(b~A,5!1,3,W!2).N(b~T,5,3!3,W!2).N(b~G,5!3,3,W)',
+     [['N(b~C,5,3!1,W).N(b~A,5!1,3,W)', 1], ['N(b~T,5,3!1,W).N(b~G,5!1,3,W)', 1]]],
+    ['8 W!+', 'N(b~A,5,3!1,W!10).N(b~C,5!1,3!2,W!11).N(b~A,5!2,3,W).N(b~T,5,3!3,W!10).N(b~G,5!3,3!4,W!11)'
+              '.N(b~A,5!4,3,W)',
+     [['N(b~A,5,3!1,W).N(b~C,5!1,3!2,W).N(b~A,5!2,3,W)', 1], ['N(b~T,5,3!1,W).N(b~G,5!1,3!2,W).N(b~A,5!2,3,W)', 1]]],
+    ['8+ W!+', 'N(b~A,5,3!1,W!10).N(b~C,5!1,3,W!11).N(b~T,5,3!2,W!10).N(b~G,5!2,3!3,W!11).N(b~A,5!3,3,W)',
+     [['N(b~A,5,3!1,W).N(b~C,5!1,3,W)', 1], ['N(b~T,5,3!1,W).N(b~G,5!1,3!2,W).N(b~A,5!2,3,W)', 1]]],
+    ['8++', 'N(b~A,5,3!1,W!2).N(b~T,5!1,3,W!2)',
+     [['N(b~A,5,3!1,W).N(b~T,5!1,3,W)', 1]]],
+    ['8*', 'N(b~A,5,3!1,W!21).N(b~A,5!1,3!2,W!22).N(b~A,5!2,3!3,W!23).N(b~C,5!3,3,W!10).N(b~T,5,3!4,W!23)'
+           '.N(b~T,5!4,3!5,W!22).N(b~T,5!5,3,W!21).N(b~G,5,3!6,W!10).N(b~A,5!6,3!7,W!31).N(b~A,5!7,3!8,W!32)'
+           '.N(b~A,5!8,3,W!33).N(b~T,5,3!9,W!33).N(b~T,5!9,3!11,W!32).N(b~T,5!11,3,W!31)',
+     [['N(b~A,5,3!4,W!1).N(b~A,5!4,3!5,W!2).N(b~A,5!5,3!6,W!3).N(b~C,5!6,3,W).N(b~T,5!7,3,W!1).N(b~T,5!8,3!7,W!2)'
+       '.N(b~T,5,3!8,W!3)', 1],
+      ['N(b~G,5,3!4,W).N(b~A,5!4,3!5,W!1).N(b~A,5!5,3!6,W!2).N(b~A,5!6,3,W!3).N(b~T,5!7,3,W!1).N(b~T,5!8,3!7,W!2)'
+       '.N(b~T,5,3!8,W!3)', 1]]],
+    ['zipper', 'N(b~C,5,3!1,W).N(b~A,5!1,3!2,W!11).N(b~A,5!2,3!3,W!12).N(b~A,5!3,3!4,W!13).N(b~G,5!4,3,W)'
+               '.N(b~C,5,3!5,W).N(b~T,5!5,3!6,W!13).N(b~T,5!6,3!7,W!12).N(b~T,5!7,3!8,W!11).N(b~G,5!8,3,W)',
+     [['N(b~C,5,3!6,W!1).N(b~A,5!6,3!7,W!2).N(b~A,5!7,3!8,W!3).N(b~A,5!8,3!9,W!4).N(b~G,5!9,3,W!5)'
+       '.N(b~G,5!10,3,W!1).N(b~T,5!11,3!10,W!2).N(b~T,5!12,3!11,W!3).N(b~T,5!13,3!12,W!4).N(b~C,5,3!13,W!5)', 1]]]]
+
+
+# check the saturation pass on the saturation cases, return the failed cases as [family, complex, products]
+def check_saturation_cases():
+    return [[family, complex, saturate_complex(complex)] for family, complex, products in saturation_cases
+            if sorted(saturate_complex(complex)) != sorted(products)]
+
+
+# reaction rules without the fast rules applied by the saturation pass
+def get_slow_reaction_rules(bngl_reaction_rules):
+    return [r for r in bngl_reaction_rules if not (r.startswith('N') and r.split()[-1] == fast_rate)]
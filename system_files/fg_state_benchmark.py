@@ -0,0 +1,75 @@
+import re
+import argparse
+import tempfile
+from shutil import rmtree
+from datetime import datetime
+from dataclasses import replace
+from system_files.simulation_config import SimulationConfig
+from system_files.simulator import Simulator, fg_state_taggings, run_simulation
+from system_files.shared_classes import read_file
+
+# fg~ state of the input species files, set again by the tagging scheme
+fg_state_syntax = re.compile(r',fg~\d+')
+
+
+# complexes of a species file as a single basket, e.g. [['N(b~A,5,3!1,W).N(b~T,5!1,3,W)', 10], ...]
+def read_basket(species_file):
+    return [[fg_state_syntax.sub('', l.rsplit('  ', 1)[0]), int(l.rsplit('  ', 1)[1])]
+            for l in read_file(species_file) if l.startswith('N')]
+
+
+# wall time of NFsim (bngl to xml and the simulation) running a basket as a single thread with the given fg state
+# tagging for the given run time, a very short run time gives the setup cost of the molecule types and species
+def measure_fg_state_tagging(config, fg_state_tagging, basket, run_time):
+    simulator = Simulator(replace(config, fg_state_tagging=fg_state_tagging, record_replay_bundle=False,
+                                  replay_bundle=None))
+    session_directory = tempfile.mkdtemp(prefix='fg_state_benchmark---', dir=config.save_results_directory)
+
+    try:
+        complexes_state_given = simulator.complexes_set_fg_state([basket])
+        step_session_folder, step_session_data = simulator.setup_session_variables(session_directory,
+                                                                                   complexes_state_given, 1, 1)
+
+        run_data = simulator.convert_to_run_formats(next(iter(step_session_data.items())))
+        nfsim_run_command = simulator.get_nfsim_run_command(run_data['dump_dir'],
+                                                            run_data['bngl_file'],
+                                                            run_data['xml_file'],
+                                                            run_data['dump_dir'], run_time)
+
+        time_start = datetime.now()
+        run_simulation(nfsim_run_command)
+        simulator.wait_for_process(step_session_folder, 1)
+        wall_time = (datetime.now() - time_start).total_seconds()
+    finally:
+        rmtree(session_directory, ignore_errors=True)
+
+    begin_molecule_state = complexes_state_given['begin_molecule_state'][0]
+
+    return {'fg_state_tagging': fg_state_tagging,
+            'fg_states': begin_molecule_state[begin_molecule_state.index(',fg'):].count('~'),
+            'wall_time': wall_time}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare NFsim setup and run wall time of the fg state taggings.')
+    parser.add_argument('parameters_file', nargs='?', default='simulation_parameters.json')
+    parser.add_argument('--species-file', help='species file of the basket, e.g. a step results file, '
+                                               'default the input species file')
+    parser.add_argument('--setup-run-time', type=float, default=1e-6,
+                        help='run time of the setup runs, default 1e-6')
+    args = parser.parse_args()
+
+    config = SimulationConfig.from_json(args.parameters_file)
+    basket = read_basket(args.species_file or config.input_species_file)
+
+    print('{} complexes, run time {}'.format(len(basket), config.run_time))
+    print('fg state tagging  fg states  setup wall time  run wall time')
+    for fg_state_tagging in fg_state_taggings:
+        setup = measure_fg_state_tagging(config, fg_state_tagging, basket, args.setup_run_time)
+        run = measure_fg_state_tagging(config, fg_state_tagging, basket, config.run_time)
+        print('{}  {}  {:.2f} s  {:.2f} s'.format(fg_state_tagging, setup['fg_states'], setup['wall_time'],
+                                                 run['wall_time']))
+
+
+if __name__ == '__main__':
+    main()
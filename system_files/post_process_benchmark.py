@@ -0,0 +1,51 @@
+import re
+import argparse
+import tracemalloc
+from datetime import datetime
+from system_files.complexes_post_processor import complexes_post_process
+from system_files.shared_classes import read_file
+
+# fg~ state of the input species files, not a part of the post processed syntax
+fg_state_syntax = re.compile(r',fg~\d+')
+
+
+# complex lines of a species file repeated the given number of times, streamed one line at a time
+def repeated_species_lines(species_lines, copies):
+    for _ in range(copies):
+        yield from species_lines
+
+
+# peak traced memory and wall time of post processing the complexes of a species file repeated the given
+# number of times, peak memory should stay flat as the number of copies grows, the output is the same
+def measure_post_process(species_file, copies):
+    species_lines = [fg_state_syntax.sub('', l) for l in read_file(species_file) if l.startswith('N')]
+
+    tracemalloc.start()
+    time_start = datetime.now()
+    species_set = complexes_post_process(repeated_species_lines(species_lines, copies), '', '', '')
+    wall_time = (datetime.now() - time_start).total_seconds()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'copies': copies,
+            'input_complexes': len(species_lines) * copies,
+            'output_complexes': len(species_set),
+            'peak_memory': peak_memory,
+            'wall_time': wall_time}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure peak memory of the complexes post process.')
+    parser.add_argument('species_file', help='species file, e.g. a step results file')
+    parser.add_argument('--copies', type=int, nargs='+', default=[1, 10, 100],
+                        help='numbers of copies of the species file to post process, default 1 10 100')
+    args = parser.parse_args()
+
+    print('copies  input complexes  output complexes  peak memory  wall time')
+    for copies in args.copies:
+        print('{copies}  {input_complexes}  {output_complexes}  {peak_memory} B  {wall_time:.2f} s'.format(
+            **measure_post_process(args.species_file, copies)))
+
+
+if __name__ == '__main__':
+    main()
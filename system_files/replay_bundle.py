@@ -0,0 +1,122 @@
+import os
+import json
+import zipfile
+import argparse
+import cProfile
+import pstats
+from dataclasses import asdict, replace, fields
+from system_files.simulation_config import SimulationConfig
+from system_files.shared_classes import is_result_dump
+
+# parameters which decide the steps, baskets and dumps of a session, taken from the recorded session on replay
+# output parameters (results directory, cadence, compression, trajectory...) are kept as given
+replayed_parameters = ['number_of_parallel_threads', 'simulation_time', 'input_species_file', 'slice_length',
+                       'complementarity_partitioning', 'partition_balance_tolerance', 'adaptive_thread_count',
+                       'thread_count_throughput', 'fast_reaction_saturation', 'region_size',
+                       'global_reshuffle_every_n_steps', 'k1_coefficient', 'random_seed', 'equilibrium_detection',
+                       'equilibrium_window_steps', 'equilibrium_tolerance', 'equilibrium_measure',
+                       'reaction_rule_pruning', 'fg_state_tagging']
+
+
+# thread files of a step in the bundle, e.g. step---3/thread---2/dx_tile---3---2.bngl
+def bundle_thread_path(run_step, thread, file_name):
+    return 'step---{}/thread---{}/{}'.format(run_step, thread, file_name)
+
+
+# records the input species, parameters, suite seed, and each step's per-thread basket inputs (bngl) and dumps
+# of a session to a zip bundle, so the session can be replayed without NFsim
+class BundleRecorder:
+
+    def __init__(self, bundle_path, config, input_species_lines, suite_seed):
+        self.bundle = zipfile.ZipFile(bundle_path, 'w', zipfile.ZIP_DEFLATED)
+        self.bundle.writestr('manifest.json', json.dumps({'config': asdict(config),
+                                                          'suite_seed': suite_seed,
+                                                          'input_species': input_species_lines}, indent=1))
+
+    # record the basket inputs and dumps of a completed step, step_session_data as given by setup_session_variables
+    def record_step(self, run_step, step_session_data):
+        for thread, thread_data in step_session_data.items():
+            for file_name in os.listdir(thread_data['thread_dir']):
+                if file_name.endswith('.bngl') or is_result_dump(file_name):
+                    self.bundle.write(os.path.join(thread_data['thread_dir'], file_name),
+                                      bundle_thread_path(run_step, thread, file_name))
+
+    def close(self):
+        self.bundle.close()
+
+
+# a recorded session, of which dumps are fed back to the threads instead of running NFsim
+# the bundle is opened on each replayed step only, so it is never left open
+class ReplayBundle:
+
+    def __init__(self, bundle_path):
+        self.bundle_path = bundle_path
+
+        with zipfile.ZipFile(bundle_path, 'r') as bundle:
+            self.names = set(bundle.namelist())
+            manifest = json.loads(bundle.read('manifest.json'))
+
+        self.recorded_config = manifest['config']
+        self.suite_seed = manifest['suite_seed']
+        self.input_species_lines = manifest['input_species']
+
+    # the config of a replay, recorded parameters replace the given ones
+    def replay_config(self, config):
+        return replace(config, **{p: self.recorded_config[p] for p in replayed_parameters},
+                       record_replay_bundle=False)
+
+    # put the recorded dumps of a step to it's thread directories, the baskets given to the threads must be
+    # the same as recorded, as the dumps are the results of the recorded baskets
+    def replay_step(self, run_step, step_session_data):
+        with zipfile.ZipFile(self.bundle_path, 'r') as bundle:
+            for thread, thread_data in step_session_data.items():
+                bngl_file_name = os.path.basename(thread_data['thread_bngl'])
+                recorded_bngl = bundle_thread_path(run_step, thread, bngl_file_name)
+                if recorded_bngl not in self.names:
+                    raise Exception('Step {} thread {} is not recorded at the replay bundle.'.format(run_step,
+                                                                                                   thread))
+
+                with open(thread_data['thread_bngl'], 'rb') as f:
+                    if f.read() != bundle.read(recorded_bngl):
+                        raise Exception('Step {} thread {} basket differs from the recorded one.'.format(run_step,
+                                                                                                       thread))
+
+                thread_prefix = bundle_thread_path(run_step, thread, '')
+                for name in self.names:
+                    if name.startswith(thread_prefix) and is_result_dump(name):
+                        with open(os.path.join(thread_data['thread_dir'], name[len(thread_prefix):]), 'wb') as f:
+                            f.write(bundle.read(name))
+
+
+def main():
+    # the simulator records and replays bundles, so it is imported when replaying only
+    from system_files.simulator import Simulator
+
+    parser = argparse.ArgumentParser(description='Replay a recorded session without NFsim, e.g. to profile '
+                                                 'or regression-test the orchestrator.')
+    parser.add_argument('bundle', help='replay bundle, "replay_bundle.zip" at a recorded session directory')
+    parser.add_argument('--results-directory', default='.', help='directory of the replayed session, default .')
+    parser.add_argument('--profile', type=int, default=0, metavar='N',
+                        help='profile the replay and print the N functions of most cumulative time')
+    args = parser.parse_args()
+
+    # NFsim and perl are not run on replay, the recorded parameters are used as they are
+    with zipfile.ZipFile(args.bundle) as bundle:
+        recorded_config = json.loads(bundle.read('manifest.json'))['config']
+    names = [f.name for f in fields(SimulationConfig)]
+    config = SimulationConfig(**{k: v for k, v in recorded_config.items() if k in names})
+    config = replace(config, save_results_directory=args.results_directory, replay_bundle=args.bundle)
+
+    simulator = Simulator(config)
+    if args.profile:
+        profiler = cProfile.Profile()
+        session_directory = profiler.runcall(simulator.run_suite)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(args.profile)
+    else:
+        session_directory = simulator.run_suite()
+
+    print('Replayed to {}'.format(session_directory))
+
+
+if __name__ == '__main__':
+    main()
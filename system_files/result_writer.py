@@ -0,0 +1,41 @@
+import threading
+from queue import Queue
+
+
+# write step results on a background thread, so the next step's simulation is not blocked by disk
+# jobs are run in the given order, the first failure is raised again at close()
+class ResultWriter:
+
+    def __init__(self):
+        self.jobs = Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            function, args = job
+            if self.error is None:
+                try:
+                    function(*args)
+                except Exception as e:
+                    self.error = e
+
+    # queue a function and it's arguments to be run on the writer thread
+    def submit(self, function, *args):
+        if self.error is not None:
+            raise self.error
+
+        self.jobs.put((function, args))
+
+    # wait until all queued jobs are written
+    def close(self):
+        self.jobs.put(None)
+        self.thread.join()
+
+        if self.error is not None:
+            raise self.error
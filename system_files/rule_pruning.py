@@ -0,0 +1,56 @@
+import re
+from system_files.complementarity_index import get_strands
+
+
+# wildcard bonds of a pattern, bound to any (+) or maybe bound (?), of which partner is not in the pattern
+wildcard_bonds = ['+', '?']
+
+
+# strand runs of a reactant pattern, as regular expressions of the bases read 5' - 3', e.g. 'A[ATCG]T'
+# molecules of a run are connected by 3' - 5' bonds, molecules without a base state match any base
+# wildcard bonds do not connect molecules of the pattern, so a run ends at them
+def get_pattern_runs(pattern):
+    molecules = []
+    for molecule in pattern.strip().split('.'):
+        sites = molecule[molecule.index('(') + 1:molecule.rindex(')')].split(',')
+        molecules.append({'base': ([s[2] for s in sites if s.startswith('b~')] or ['[ATCG]'])[0],
+                          'five': ([s[2:] for s in sites if s.startswith('5!') and s[2:] not in wildcard_bonds]
+                                   or [None])[0],
+                          'three': ([s[2:] for s in sites if s.startswith('3!') and s[2:] not in wildcard_bonds]
+                                    or [None])[0]})
+
+    five_bonds = {m['five']: i for i, m in enumerate(molecules) if m['five'] is not None}
+    three_bonds = set([m['three'] for m in molecules if m['three'] is not None])
+
+    runs = []
+    for molecule in molecules:
+        # a run starts at a molecule which is not bound on 5' side within the pattern
+        if molecule['five'] is None or molecule['five'] not in three_bonds:
+            run, current = [], molecule
+            while current is not None:
+                run.append(current['base'])
+                current = molecules[five_bonds[current['three']]] if current['three'] in five_bonds else None
+            runs.append(re.compile(''.join(run)))
+
+    return runs
+
+
+# strand runs of the reactants of each reaction rule, None for lines which are not rules
+# parsed once per session, as rules never change the bases or the strands, a rule of which run is not found
+# on any strand of a basket can not be applied during the step
+def index_reaction_rules(bngl_reaction_rules):
+    return [[run for reactant in r.split('->')[0].split(' + ') for run in get_pattern_runs(reactant)]
+            if r.startswith('N') else None for r in bngl_reaction_rules]
+
+
+# reaction rules which may be applied to the complexes of a basket, e.g. [['N(b~A,5,3!1,W).N(b~T,5!1,3,W)', 10], ...]
+# strand_sequences keeps the 5' - 3' strand sequences of complexes seen before
+def prune_reaction_rules(bngl_reaction_rules, rules_index, basket, strand_sequences):
+    for complex in basket:
+        if complex[0] not in strand_sequences:
+            strand_sequences[complex[0]] = [''.join([n[0] for n in s]) for s in get_strands(complex[0])]
+
+    sequences = ' '.join(set([s for complex in basket for s in strand_sequences[complex[0]]]))
+
+    return [r for r, runs in zip(bngl_reaction_rules, rules_index)
+            if runs is None or all([run.search(sequences) for run in runs])]
@@ -0,0 +1,89 @@
+import argparse
+import tempfile
+from shutil import rmtree
+from dataclasses import replace
+from system_files.simulation_config import SimulationConfig
+from system_files.species_metrics import complex_distribution
+from system_files.rule_pruning import index_reaction_rules, prune_reaction_rules
+from system_files.validation import run_suites
+
+
+# single strand complex of a 5' - 3' sequence, e.g. 'AT' to 'N(b~A,5,3!1,W).N(b~T,5!1,3,W)'
+def strand_complex(sequence):
+    return '.'.join(['N(b~{},5{},3{},W)'.format(b, '!{}'.format(i) if i else '',
+                                               '!{}'.format(i + 1) if i < len(sequence) - 1 else '')
+                     for i, b in enumerate(sequence)])
+
+
+# reaction rules, baskets (as strand sequences) and whether the rule is kept, checked without NFsim
+pruning_cases = [
+    ['N(b~A,3!1,W,fg).N(b~A,5!1,3!2,W,fg).N(b~A,5!2,W,fg) + N(b~T,3!3,W,fg).N(b~T,5!3,3!4,W,fg).N(b~T,5!4,W,fg)'
+     ' -> N(b~A,3!1,W!5,fg!11).N(b~A,5!1,3!2,W!6,fg).N(b~A,5!2,W!7,fg!22).N(b~T,3!3,W!7,fg!22)'
+     '.N(b~T,5!3,3!4,W!6,fg).N(b~T,5!4,W!5,fg!11) k1', ['CAAAG', 'GTTTC'], True],
+    ['N(b~A,3!1,W,fg).N(b~A,5!1,3!2,W,fg).N(b~A,5!2,W,fg) + N(b~T,3!3,W,fg).N(b~T,5!3,3!4,W,fg).N(b~T,5!4,W,fg)'
+     ' -> N(b~A,3!1,W!5,fg!11).N(b~A,5!1,3!2,W!6,fg).N(b~A,5!2,W!7,fg!22).N(b~T,3!3,W!7,fg!22)'
+     '.N(b~T,5!3,3!4,W!6,fg).N(b~T,5!4,W!5,fg!11) k1', ['CAAAG', 'GTTC'], False],
+    ['N(b~A,5,3!+,W).N(b~G,5!+,3,W) -> N(b~A,5,3!+,W!1).N(b~G,5!+,3,W!1) k1', ['ACG'], True],
+    ['N(b~A,5,3!+,W).N(b~G,5!+,3,W) -> N(b~A,5,3!+,W!1).N(b~G,5!+,3,W!1) k1', ['ACT'], False],
+    ['N(b~A,5!?,3!1,W).N(b~C,5!1,3!?,W) -> N(b~A,5!?,3!1,W!2).N(b~C,5!1,3!?,W!2) k1', ['GACT'], True],
+    ['N(b~A,5!?,3!1,W).N(b~C,5!1,3!?,W) -> N(b~A,5!?,3!1,W!2).N(b~C,5!1,3!?,W!2) k1', ['CA'], False],
+    ['end reaction rules', ['T'], True]]
+
+
+# check the rule index and the pruning on the pruning cases, return the failed cases
+def check_pruning_cases():
+    failed = []
+    for rule, sequences, kept in pruning_cases:
+        basket = [[strand_complex(s), 1] for s in sequences]
+        if bool(prune_reaction_rules([rule], index_reaction_rules([rule]), basket, {})) != kept:
+            failed.append([rule, sequences, kept])
+
+    return failed
+
+
+# run the same seeded suite with the full and the pruned reaction rules, return the steps of which species differ
+# and the wall times, as rules which can not be applied never fire, the trajectories should be the same
+def compare_pruned_rules(config, seed):
+    check_directory = tempfile.mkdtemp(prefix='rule_pruning---', dir=config.save_results_directory)
+    config = replace(config, save_results_directory=check_directory, equilibrium_detection=False,
+                     record_replay_bundle=False, replay_bundle=None)
+
+    try:
+        full = run_suites(replace(config, reaction_rule_pruning=False), [seed])
+        pruned = run_suites(replace(config, reaction_rule_pruning=True), [seed])
+    finally:
+        rmtree(check_directory, ignore_errors=True)
+
+    different_steps = [run_step for run_step in sorted(full[0])
+                       if complex_distribution(full[0][run_step]) != complex_distribution(pruned[0][run_step])]
+
+    return {'different_steps': different_steps, 'wall_time': [full[2][0], pruned[2][0]]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that pruned reaction rules give the same trajectory '
+                                                 'as the full rules for a fixed seed.')
+    parser.add_argument('parameters_file', nargs='?', default='simulation_parameters.json')
+    parser.add_argument('--seed', type=int, default=1, help='random seed of both runs, default 1')
+    parser.add_argument('--check-cases', action='store_true',
+                        help='check the rule index and the pruning on known baskets only, without NFsim')
+    args = parser.parse_args()
+
+    if args.check_cases:
+        failed = check_pruning_cases()
+        for rule, sequences, kept in failed:
+            print('{} on {}: expected {}'.format(rule, sequences, 'kept' if kept else 'pruned'))
+        print('{} of {} cases passed'.format(len(pruning_cases) - len(failed), len(pruning_cases)))
+        return
+
+    comparison = compare_pruned_rules(SimulationConfig.from_json(args.parameters_file), args.seed)
+
+    if comparison['different_steps']:
+        print('Species differ at steps {}'.format(comparison['different_steps']))
+    else:
+        print('Same species at all steps')
+    print('wall time (full / pruned): {:.1f} s / {:.1f} s'.format(*comparison['wall_time']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import tempfile
+from shutil import rmtree
+from dataclasses import replace
+from system_files.simulation_config import SimulationConfig
+from system_files.validation import run_suites
+from system_files.fast_reactions import saturation_cases, check_saturation_cases
+from system_files.species_metrics import (complex_distribution,
+                                          total_variation_distance,
+                                          bound_fraction,
+                                          mean_complex_size)
+
+
+# run the same input with and without the fast reactions saturation pass, and measure on each step
+# how far the saturated complexes distribution drifts from the default mode
+def measure_saturation_drift(config, number_of_test_suites):
+    check_directory = tempfile.mkdtemp(prefix='saturation_drift---', dir=config.save_results_directory)
+
+    # all steps are run, so the steps of both modes can be compared
+    config = replace(config, save_results_directory=check_directory, equilibrium_detection=False,
+                     record_replay_bundle=False, replay_bundle=None)
+
+    # each suite is seeded differently if a random seed is given, both modes are given the same seeds
+    seeds = [None] * number_of_test_suites
+    if config.random_seed is not None:
+        seeds = [config.random_seed + i for i in range(0, number_of_test_suites)]
+
+    try:
+        default = run_suites(replace(config, fast_reaction_saturation=False), seeds)
+        saturated = run_suites(replace(config, fast_reaction_saturation=True), seeds)
+    finally:
+        rmtree(check_directory, ignore_errors=True)
+
+    rows = []
+    for run_step in sorted(default[0]):
+        default_distribution = complex_distribution(default[0][run_step])
+        saturated_distribution = complex_distribution(saturated[0][run_step])
+        rows.append({'run_step': run_step,
+                     'model_time': default[1][run_step],
+                     'total_variation_distance': total_variation_distance(default_distribution,
+                                                                          saturated_distribution),
+                     'bound_fraction': [bound_fraction(default_distribution), bound_fraction(saturated_distribution)],
+                     'mean_complex_size': [mean_complex_size(default_distribution),
+                                           mean_complex_size(saturated_distribution)]})
+
+    return {'rows': rows, 'wall_time': [sum(default[2]), sum(saturated[2])]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the drift of the fast reactions saturation pass '
+                                                 'from the default mode.')
+    parser.add_argument('parameters_file', nargs='?', default='simulation_parameters.json')
+    parser.add_argument('--test-suites', type=int, default=1, help='number of test suites per mode, default 1')
+    parser.add_argument('--check-cases', action='store_true',
+                        help='check the saturation pass on known complexes of each fast rule family only, '
+                             'without NFsim')
+    args = parser.parse_args()
+
+    if args.check_cases:
+        failed = check_saturation_cases()
+        for family, complex, products in failed:
+            print('{} {}: saturated to {}'.format(family, complex, products))
+        print('{} of {} cases passed'.format(len(saturation_cases) - len(failed), len(saturation_cases)))
+        return
+
+    drift = measure_saturation_drift(SimulationConfig.from_json(args.parameters_file), args.test_suites)
+
+    print('step  model time  TV distance  bound fraction (default / saturated)  '
+          'strands per complex (default / saturated)')
+    for row in drift['rows']:
+        print('{}  {}  {:.4f}  {:.4f} / {:.4f}  {:.3f} / {:.3f}'.format(row['run_step'], row['model_time'],
+                                                                      row['total_variation_distance'],
+                                                                      *row['bound_fraction'],
+                                                                      *row['mean_complex_size']))
+    print('wall time (default / saturated): {:.1f} s / {:.1f} s'.format(*drift['wall_time']))
+
+
+if __name__ == '__main__':
+    main()
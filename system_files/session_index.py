@@ -0,0 +1,173 @@
+import os
+import re
+import sqlite3
+import argparse
+from system_files.shared_classes import read_file
+from system_files.trajectory_store import TrajectoryReader
+
+# step results file name, e.g. dx_tile_(step-12)_(threads-8)_nf.1.2_step_result.species.gz
+step_result_syntax = re.compile(r'_\(step-(\d+)\)_\(threads-\d+\)_nf\.([\d.]+)_step_result\.species(\.gz|\.xz)?$')
+
+index_schema = '''
+CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY, key TEXT UNIQUE, name TEXT, path TEXT);
+CREATE TABLE IF NOT EXISTS complexes (id INTEGER PRIMARY KEY, syntax TEXT UNIQUE, sequence TEXT,
+                                      strands INTEGER, nucleotides INTEGER);
+CREATE TABLE IF NOT EXISTS steps (session_id INTEGER, step INTEGER, model_time REAL,
+                                  PRIMARY KEY (session_id, step));
+CREATE TABLE IF NOT EXISTS postings (complex_id INTEGER, session_id INTEGER, step INTEGER, count INTEGER);
+CREATE INDEX IF NOT EXISTS postings_by_complex ON postings (complex_id, session_id, step);
+CREATE INDEX IF NOT EXISTS complexes_by_strands ON complexes (strands);
+CREATE INDEX IF NOT EXISTS complexes_by_sequence ON complexes (sequence);
+'''
+
+
+# on-disk index of session step results, from canonical complex to (session, step, count) postings
+class SessionIndex:
+
+    def __init__(self, index_file):
+        self.connection = sqlite3.connect(index_file)
+        self.connection.executescript(index_schema)
+        self.complex_ids = dict(self.connection.execute('SELECT syntax, id FROM complexes'))
+
+    def close(self):
+        self.connection.close()
+
+    # a session is keyed by it's resolved path without the run time duration, which is added to the directory name
+    # at the end of the suite, so sessions of the same name in different results directories are kept apart
+    def session_id(self, session_directory):
+        session_directory = os.path.normpath(session_directory)
+        name = '---'.join(os.path.basename(session_directory).split('---')[:3])
+        key = os.path.join(os.path.realpath(os.path.dirname(session_directory)), name)
+        self.connection.execute('INSERT OR IGNORE INTO sessions (key, name) VALUES (?, ?)', (key, name))
+        self.connection.execute('UPDATE sessions SET path = ? WHERE key = ?', (session_directory, key))
+
+        return self.connection.execute('SELECT id FROM sessions WHERE key = ?', (key,)).fetchone()[0]
+
+    def complex_id(self, syntax):
+        if syntax not in self.complex_ids:
+            sequence = ''.join([n[4] for n in syntax.split('.')])
+            strands = syntax.count(',5,')
+            cursor = self.connection.execute('INSERT INTO complexes (syntax, sequence, strands, nucleotides) '
+                                             'VALUES (?, ?, ?, ?)', (syntax, sequence, strands, len(sequence)))
+            self.complex_ids[syntax] = cursor.lastrowid
+
+        return self.complex_ids[syntax]
+
+    def add_step(self, session_id, step, model_time, species_set):
+        self.connection.execute('INSERT INTO steps VALUES (?, ?, ?)', (session_id, step, model_time))
+        self.connection.executemany('INSERT INTO postings VALUES (?, ?, ?, ?)',
+                                    [(self.complex_id(c[0]), session_id, step, int(c[1])) for c in species_set])
+
+    # index the steps of a session not indexed yet, from it's trajectory if saved, else from the step results
+    # return number of newly indexed steps
+    def update_session(self, session_directory):
+        session_id = self.session_id(session_directory)
+        indexed_steps = set([s[0] for s in self.connection.execute('SELECT step FROM steps WHERE session_id = ?',
+                                                                   (session_id,))])
+        n_indexed = 0
+
+        trajectory_directory = os.path.join(session_directory, 'trajectory')
+        if os.path.isdir(trajectory_directory):
+            for step, model_time, species_set in TrajectoryReader(trajectory_directory).iter_species():
+                if step not in indexed_steps:
+                    self.add_step(session_id, step, model_time, species_set)
+                    n_indexed += 1
+
+        else:
+            for path, subdirs, files in os.walk(session_directory):
+                for name in files:
+                    step_result = step_result_syntax.search(name)
+                    if step_result and int(step_result.group(1)) not in indexed_steps:
+                        species_set = [l.rsplit('  ', 1) for l in read_file(os.path.join(path, name))
+                                       if l.startswith('N')]
+                        self.add_step(session_id, int(step_result.group(1)), float(step_result.group(2)),
+                                      species_set)
+                        n_indexed += 1
+
+        self.connection.commit()
+
+        return n_indexed
+
+    # index a session directory, or all session directories in a results directory
+    def update(self, directory):
+        if any([d.startswith('step---') for d in os.listdir(directory)]):
+            return self.update_session(directory)
+
+        return sum([self.update_session(os.path.join(directory, d)) for d in sorted(os.listdir(directory))
+                    if '---simulation_results---' in d and os.path.isdir(os.path.join(directory, d))])
+
+    # complexes matching the given syntax, 5' - 3' sequence (strands joined) or minimum number of strands
+    def match_complexes(self, syntax=None, sequence=None, min_strands=None):
+        conditions, arguments = [], []
+        for condition, argument in [['syntax = ?', syntax], ['sequence = ?', sequence],
+                                    ['strands >= ?', min_strands]]:
+            if argument is not None:
+                conditions.append(condition)
+                arguments.append(argument)
+
+        return 'SELECT id FROM complexes WHERE ' + ' AND '.join(conditions or ['1']), arguments
+
+    # first step of each session at which a matching complex exists, as [session, step, model time]
+    def first_appearance(self, syntax=None, sequence=None, min_strands=None):
+        query, arguments = self.match_complexes(syntax, sequence, min_strands)
+
+        return self.connection.execute('SELECT sessions.name, MIN(postings.step), steps.model_time '
+                                       'FROM postings '
+                                       'JOIN sessions ON sessions.id = postings.session_id '
+                                       'JOIN steps ON steps.session_id = postings.session_id '
+                                       'AND steps.step = postings.step '
+                                       'WHERE postings.complex_id IN (' + query + ') AND postings.count > 0 '
+                                       'GROUP BY postings.session_id ORDER BY sessions.name',
+                                       arguments).fetchall()
+
+    # number of copies of matching complexes over time, as [session, step, model time, count]
+    def complex_counts(self, syntax=None, sequence=None, min_strands=None):
+        query, arguments = self.match_complexes(syntax, sequence, min_strands)
+
+        return self.connection.execute('SELECT sessions.name, steps.step, steps.model_time, '
+                                       'COALESCE(SUM(postings.count), 0) '
+                                       'FROM steps '
+                                       'JOIN sessions ON sessions.id = steps.session_id '
+                                       'LEFT JOIN postings ON postings.session_id = steps.session_id '
+                                       'AND postings.step = steps.step '
+                                       'AND postings.complex_id IN (' + query + ') '
+                                       'GROUP BY steps.session_id, steps.step '
+                                       'ORDER BY sessions.name, steps.step',
+                                       arguments).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index session step results and query complexes over time.')
+    parser.add_argument('index_file', help='index database file, created if not exists')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    update_parser = subparsers.add_parser('update', help='index new steps of sessions')
+    update_parser.add_argument('directories', nargs='+', help='session directories or results directories')
+
+    for command in ['first', 'counts']:
+        query_parser = subparsers.add_parser(command, help='first appearance of complexes' if command == 'first'
+                                             else 'number of copies of complexes over time')
+        query_parser.add_argument('--syntax', help='canonical complex syntax, as written in step results')
+        query_parser.add_argument('--sequence', help="5' - 3' sequence, as commented in step results")
+        query_parser.add_argument('--min-strands', type=int, help='minimum number of strands of the complex')
+
+    args = parser.parse_args()
+
+    session_index = SessionIndex(args.index_file)
+    if args.command == 'update':
+        for directory in args.directories:
+            print('{} new steps indexed from {}'.format(session_index.update(directory), directory))
+
+    elif args.command == 'first':
+        for row in session_index.first_appearance(args.syntax, args.sequence, args.min_strands):
+            print('{}  step {}  model time {}'.format(*row))
+
+    elif args.command == 'counts':
+        for row in session_index.complex_counts(args.syntax, args.sequence, args.min_strands):
+            print('{}  step {}  model time {}  count {}'.format(*row))
+
+    session_index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,6 @@
 import os
+import gzip
+import lzma
 
 
 def convert_link_address(d):
@@ -15,8 +17,23 @@ def convert_link_address(d):
     return dir_win
 
 
+# open a text file, compressed by gzip or xz if the file name ends with .gz or .xz
+def open_text_file(file_path, mode):
+    if str(file_path).endswith('.gz'):
+        return gzip.open(file_path, mode + 't')
+    elif str(file_path).endswith('.xz'):
+        return lzma.open(file_path, mode + 't')
+
+    return open(file_path, mode)
+
+
+# NFsim dump file of a thread's results, e.g. dx_tile---3---2.0
+def is_result_dump(file_name):
+    return file_name.endswith('.0') and not file_name.endswith('.0.dump.0')
+
+
 def read_file(file_path):
-    with open(file_path, 'r') as f:
+    with open_text_file(file_path, 'r') as f:
         all_lines = f.readlines()
 
         lines = []
@@ -29,7 +46,7 @@ def read_file(file_path):
 
 
 def write_file(write_path, str_list):
-    with open(write_path, 'w') as f:
+    with open_text_file(write_path, 'w') as f:
         f.write("%s" % '\n')
         for str_line in str_list:
             f.write("%s" % str_line + '\n')
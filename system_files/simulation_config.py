@@ -0,0 +1,108 @@
+import json
+import math
+from dataclasses import dataclass, field, fields
+
+
+# simulation parameters, as given at simulation_parameters.json file
+@dataclass
+class SimulationConfig:
+    number_of_parallel_threads: int
+    simulation_time: float
+    number_of_test_suites: int
+    input_species_file: str
+    save_results_directory: str
+    perl_interpreter: str
+    nfsim_perl_interface: str
+    nfsim_simulator: str
+    delete_temporary_files: bool = True
+
+    # optional parameters, put complementary complexes to the same basket within the given balance tolerance
+    complementarity_partitioning: bool = False
+    partition_balance_tolerance: float = 0.1
+
+    # optional parameters, write step results every n steps and at the given model times (the final step is
+    # always written), compressed by "gzip" or "xz" if given
+    write_results_every_n_steps: int = 1
+    write_results_at_model_times: list = field(default_factory=list)
+    results_compression: str = None
+
+    # optional parameters, save a delta encoded trajectory of all steps with a full keyframe every n steps
+    save_trajectory: bool = False
+    trajectory_keyframe_interval: int = 50
+
+    # optional parameters, model time simulated by a single step, and re-tune the number of threads on steps which
+    # can not fill all threads, by the measured throughput per number of threads (written by the autotuner)
+    slice_length: float = 0.1
+    adaptive_thread_count: bool = False
+    thread_count_throughput: dict = field(default_factory=dict)
+
+    # optional parameter, apply the near-instant (k_max) reactions by a deterministic pass between steps
+    # instead of NFsim
+    fast_reaction_saturation: bool = False
+
+    # optional parameters, group threads to regions of region_size threads which exchange complexes only within
+    # the region, with a global reshuffle of all complexes every n steps, 0 for a single region of all threads
+    region_size: int = 0
+    global_reshuffle_every_n_steps: int = 1
+
+    # optional parameters, k1 (kinetic rate) is multiplied by k1_coefficient and the number of threads of a step
+    # to make up for splitting, and a random seed makes the basket shuffles and NFsim runs repeatable
+    k1_coefficient: float = 1.225
+    random_seed: int = None
+
+    # optional parameters, stop a test suite early when the drift of the merged species ("species") or their
+    # observables ("observables") from each of the last window steps stays below the tolerance
+    equilibrium_detection: bool = False
+    equilibrium_window_steps: int = 5
+    equilibrium_tolerance: float = 0.02
+    equilibrium_measure: str = 'species'
+
+    # optional parameters, record each step's per-thread basket inputs and dumps to "replay_bundle.zip" at the
+    # session directory, or replay a recorded bundle instead of running NFsim
+    record_replay_bundle: bool = False
+    replay_bundle: str = None
+
+    # optional parameter, give each thread only the reaction rules of which strand patterns occur in it's basket
+    reaction_rule_pruning: bool = False
+
+    # optional parameter, fg~ state of the species molecules, "constant" tags all molecules with fg~0 and
+    # "per_complex" gives each complex of a basket it's own fg~ state
+    fg_state_tagging: str = 'constant'
+
+    # initialize parameters from a simulation_parameters.json like file, unknown keys are ignored
+    @classmethod
+    def from_json(cls, file_path):
+        with open(file_path) as f:
+            parameters = json.load(f)
+
+        names = [f.name for f in fields(cls)]
+
+        return cls(**{k: v for k, v in parameters.items() if k in names})
+
+    # number of splits to be performed during the simulations
+    @property
+    def number_of_splits(self):
+        return math.ceil(round(self.simulation_time / self.slice_length, 6))
+
+    # the length of time to perform the simulation
+    @property
+    def run_time(self):
+        return round((self.simulation_time / self.number_of_splits), 6)
+
+    # simulation duration for a single step
+    @property
+    def run_time_per_step(self):
+        return self.number_of_splits / self.simulation_time  # only for time stamp purpose
+
+    # steps of which results are written to the session directory
+    @property
+    def result_steps(self):
+        steps = set(range(self.write_results_every_n_steps, self.number_of_splits + 1,
+                          self.write_results_every_n_steps))
+        steps.add(self.number_of_splits)
+
+        # a given model time is written at the first step reaching it
+        for model_time in self.write_results_at_model_times:
+            steps.add(min(max(math.ceil(round(model_time * self.run_time_per_step, 6)), 1), self.number_of_splits))
+
+        return steps
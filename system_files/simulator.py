@@ -0,0 +1,689 @@
+import os
+import json
+from collections import Counter
+from random import Random
+from dataclasses import replace
+from datetime import datetime
+from shutil import move
+from pathlib import Path
+from joblib import Parallel, delayed
+from system_files.convert_results_dump_to_species import convert_dump_to_species
+from system_files.complexes_post_processor import complexes_post_process
+from system_files.complementarity_index import update_kmer_index, binding_affinity
+from system_files.fast_reactions import saturate_species, get_slow_reaction_rules
+from system_files.rule_pruning import index_reaction_rules, prune_reaction_rules
+from system_files.equilibrium import EquilibriumMonitor, equilibrium_measures
+from system_files.result_writer import ResultWriter
+from system_files.replay_bundle import BundleRecorder, ReplayBundle
+from system_files.trajectory_store import TrajectoryWriter
+from system_files.shared_classes import (convert_link_address,
+                                         read_file,
+                                         write_file,
+                                         is_result_dump,
+                                         delete_temp_files)
+
+# directory of the static bngl script blocks
+bngl_script_directory = os.path.join(Path(__file__).resolve().parent.parent, 'bngl_script_files')
+
+# file name extensions of the step results compression options
+compression_extensions = {None: '', 'gzip': '.gz', 'xz': '.xz'}
+
+# fg~ state tagging schemes of the species molecules
+fg_state_taggings = ['constant', 'per_complex']
+
+
+# distributed simulation engine, static bngl syntax and input species are loaded once
+# and reused by all test suites run by the same simulator
+class Simulator:
+
+    def __init__(self, config):
+        # a replayed session runs with the recorded parameters and input species, and the recorded dumps
+        self.replay_bundle = None
+        if config.replay_bundle is not None:
+            self.replay_bundle = ReplayBundle(config.replay_bundle)
+            config = self.replay_bundle.replay_config(config)
+
+        # a recorded session is seeded, so the replay gives the same baskets to the threads
+        if config.record_replay_bundle and config.random_seed is None:
+            config = replace(config, random_seed=Random().randrange(1, 2 ** 31))
+
+        self.config = config
+
+        if config.number_of_splits <= 1:
+            raise Exception('Too short simulation time for distributed processing.')
+
+        if config.write_results_every_n_steps < 1:
+            raise Exception('Write results every n steps must be at least 1.')
+
+        if config.results_compression not in compression_extensions:
+            raise Exception('Unknown results compression "{}", use "gzip" or "xz".'.format(config.results_compression))
+
+        if config.region_size < 0 or config.global_reshuffle_every_n_steps < 1:
+            raise Exception('Region size must be at least 0 and global reshuffle every n steps at least 1.')
+
+        if config.equilibrium_measure not in equilibrium_measures:
+            raise Exception('Unknown equilibrium measure "{}", use "species" or "observables".'.format(
+                config.equilibrium_measure))
+
+        if config.fg_state_tagging not in fg_state_taggings:
+            raise Exception('Unknown fg state tagging "{}", use "constant" or "per_complex".'.format(
+                config.fg_state_tagging))
+
+        self.input_species_file_name = Path(config.input_species_file).stem
+
+        # k1 kinetic value on the bngl file is updated per number of threads used by a step
+        self.bngl_parameters = read_file(os.path.join(bngl_script_directory, 'parameters.bngl'))
+        self.bngl_parameters_k1_updated = {}
+        self.bngl_observables = read_file(os.path.join(bngl_script_directory, 'observables.bngl'))
+        self.bngl_functions = read_file(os.path.join(bngl_script_directory, 'functions.bngl'))
+        self.bngl_reaction_rules = read_file(os.path.join(bngl_script_directory, 'reaction_rules.bngl'))
+
+        # fast reactions are left to the saturation pass
+        if config.fast_reaction_saturation:
+            self.bngl_reaction_rules = get_slow_reaction_rules(self.bngl_reaction_rules)
+
+        # strand runs of each rule's reactants, to give each thread only the rules which may apply to it's basket
+        self.reaction_rules_index = None
+        if config.reaction_rule_pruning:
+            self.reaction_rules_index = index_reaction_rules(self.bngl_reaction_rules)
+
+        # initialize input species as a list
+        if self.replay_bundle is not None:
+            self.input_species_lines = self.replay_bundle.input_species_lines
+        else:
+            self.input_species_lines = [l for l in read_file(config.input_species_file) if l.startswith('N')]
+        self.input_species_set = [['.'.join([','.join(n.split(',')[:-1]) + ')'
+                                             for n in l.split('  ')[0].split('.')]), l.split('  ')[1]] for l in
+                                  self.input_species_lines]
+
+        # calculate and save number of nucleotides in the input file
+        self.sum_nucleotides = sum([len(i[0].split('.')) * int(i[1]) for i in self.input_species_set])
+
+        # seeds of the test suites, repeatable if a random seed is given
+        self.suite_seeds = Random(config.random_seed)
+
+        # random numbers of basket shuffles and NFsim seeds, re-seeded by each test suite's seed
+        self.random = Random(config.random_seed)
+
+        # parallel jobs runner, kept for all steps and test suites
+        self.parallel = Parallel(n_jobs=config.number_of_parallel_threads)
+
+    # run given number of test suites, return the list of session directories
+    def run(self, number_of_test_suites=None, progress_callback=None):
+        if number_of_test_suites is None:
+            number_of_test_suites = self.config.number_of_test_suites
+
+        return [self.run_suite(progress_callback) for _ in range(number_of_test_suites)]
+
+    # run a single test suite, progress_callback is called with each step's results
+    def run_suite(self, progress_callback=None):
+        time_start = datetime.now()
+
+        session_directory = None
+        for step_result in self.iter_steps():
+            session_directory = step_result['session_directory']
+            if progress_callback is not None:
+                progress_callback(step_result)
+
+        time_end = datetime.now()
+        sim_duration = str(time_end - time_start).rsplit('.', 1)[0].replace(':', '.')
+
+        # delete temporary files for saving hard drive space, given by user "delete_temporary_files": true/false
+        if self.config.delete_temporary_files:
+            delete_temp_files(session_directory)
+
+        # rename the session directory with run time duration
+        move(session_directory, session_directory + '---' + sim_duration)
+
+        return session_directory + '---' + sim_duration
+
+    # run a single test suite step by step, yield each step's results when the step is completed
+    def iter_steps(self):
+
+        # initialize and create main session directory
+        session_directory = self.make_session_directory()
+
+        # each test suite draws it's basket shuffles and NFsim seeds from it's own seed, so any suite of a run
+        # can be replayed, a replayed suite is given the recorded seed
+        if self.replay_bundle is not None:
+            suite_seed = self.replay_bundle.suite_seed
+        else:
+            suite_seed = self.suite_seeds.randrange(1, 2 ** 31)
+        self.random = Random(suite_seed)
+
+        # step results are written on background, all of them are written when the test suite is finished
+        result_writer = ResultWriter()
+
+        # each step's per-thread basket inputs and dumps are recorded to a replay bundle of the session
+        bundle_recorder = None
+        if self.config.record_replay_bundle:
+            bundle_recorder = BundleRecorder(os.path.join(session_directory, 'replay_bundle.zip'), self.config,
+                                             self.input_species_lines, suite_seed)
+        try:
+            yield from self.simulate_steps(session_directory, result_writer, bundle_recorder)
+        finally:
+            result_writer.close()
+            if bundle_recorder is not None:
+                bundle_recorder.close()
+
+    # create a session directory named by the second the session starts, sessions started on the same second
+    # are numbered, e.g. dx_tile---simulation_results---19-10-2026--134622-2, also against finished sessions
+    # of which directories are renamed with their run time duration
+    def make_session_directory(self):
+        session_folder_name = '{}---simulation_results---{}'.format(self.input_species_file_name,
+                                                                    datetime.now().strftime('%d-%m-%Y--%H%M%S'))
+        session_number = 1
+        while True:
+            numbered_folder_name = session_folder_name if session_number == 1 \
+                else '{}-{}'.format(session_folder_name, session_number)
+            session_directory = os.path.join(self.config.save_results_directory, numbered_folder_name)
+
+            if not any([d.startswith(numbered_folder_name + '---')
+                        for d in os.listdir(self.config.save_results_directory)]):
+                try:
+                    os.mkdir(session_directory)
+                    return session_directory
+                except FileExistsError:
+                    pass
+
+            session_number += 1
+
+    # simulate all steps of a test suite at the session directory
+    def simulate_steps(self, session_directory, result_writer, bundle_recorder=None):
+        config = self.config
+        number_of_splits = config.number_of_splits
+        result_steps = config.result_steps
+
+        # free k-mers of every complex seen during the session, used for complementarity partitioning
+        kmer_index = {}
+
+        # strand sequences of every complex seen during the session, used for reaction rule pruning
+        strand_sequences = {}
+
+        # input species are post processed as the steps' complexes, so a complex keeps it's canonical syntax
+        # from step 0
+        species_set = complexes_post_process(['{}  {}'.format(*c) for c in self.input_species_set], '', '', '')
+
+        # products of the fast reactions saturation of every complex seen during the session
+        saturation_cache = {}
+        if config.fast_reaction_saturation:
+            species_set = saturate_species(species_set, saturation_cache)
+
+        # trajectory of the session, starting with the input species at step 0
+        trajectory_writer = None
+        if config.save_trajectory:
+            trajectory_writer = TrajectoryWriter(os.path.join(session_directory, 'trajectory'),
+                                                 config.trajectory_keyframe_interval)
+            result_writer.submit(trajectory_writer.write_step, 0, 0, species_set)
+
+        # drift of the merged species over the last steps, the suite is stopped when it reaches equilibrium
+        equilibrium_monitor = None
+        if config.equilibrium_detection:
+            equilibrium_monitor = EquilibriumMonitor(config.equilibrium_window_steps, config.equilibrium_tolerance,
+                                                     config.equilibrium_measure)
+
+        # complexes of each region as post processed species sets, and the number of threads of each region
+        # regions are formed on global reshuffle steps, a single region of all threads if regions are not used
+        region_species_sets = [species_set]
+        region_thread_counts = [config.number_of_parallel_threads]
+        k1_n_threads = config.number_of_parallel_threads
+
+        for run_step in range(1, number_of_splits + 1):
+            step_model_time = run_step / config.run_time_per_step
+
+            if run_step % config.run_time_per_step == 0:
+                step_model_time = int(step_model_time)
+
+            # index free k-mers of the newly formed complexes
+            if config.complementarity_partitioning:
+                update_kmer_index(kmer_index, species_set)
+
+            if (run_step - 1) % config.global_reshuffle_every_n_steps == 0:
+                # split complexes saved at species_set, to maximum possible number of threads
+                split_complexes = self.get_split_complexes(species_set, config.number_of_parallel_threads,
+                                                           kmer_index)
+
+                # k1 is diluted by the number of threads really used if the complexes can not fill all of them
+                k1_n_threads = config.number_of_parallel_threads
+                if config.adaptive_thread_count \
+                        and split_complexes['possible_thread_count'] < config.number_of_parallel_threads:
+                    k1_n_threads = self.retune_thread_count(split_complexes['possible_thread_count'])
+                    if k1_n_threads != split_complexes['possible_thread_count']:
+                        split_complexes = self.get_split_complexes(species_set, k1_n_threads, kmer_index)
+
+                # group the threads to regions of region_size threads
+                complexes_for_threads = split_complexes['complexes_for_threads']
+                region_thread_counts = self.get_region_thread_counts(split_complexes['possible_thread_count'])
+                step_region_thread_counts = region_thread_counts
+
+            else:
+                # split complexes of each region to the threads of the region only, k1 is kept as diluted
+                # on the last global reshuffle step, as each thread keeps the same share of the complexes
+                complexes_for_threads, step_region_thread_counts = [], []
+                for region_species_set, region_thread_count in zip(region_species_sets, region_thread_counts):
+                    split_complexes = self.get_split_complexes(region_species_set, region_thread_count, kmer_index)
+                    complexes_for_threads += split_complexes['complexes_for_threads']
+                    step_region_thread_counts.append(split_complexes['possible_thread_count'])
+
+            # reaction rules which may be applied to each thread's basket
+            thread_reaction_rules = None
+            if config.reaction_rule_pruning:
+                thread_reaction_rules = [prune_reaction_rules(self.bngl_reaction_rules, self.reaction_rules_index,
+                                                              basket, strand_sequences)
+                                         for basket in complexes_for_threads]
+
+            # give fg~ state
+            complexes_state_given = self.complexes_set_fg_state(complexes_for_threads)
+
+            # declare number of parallel threads to be utilized
+            alternative_n_threads = len(complexes_for_threads)
+
+            step_session_folder, step_session_data = self.setup_session_variables(session_directory,
+                                                                                  complexes_state_given,
+                                                                                  run_step,
+                                                                                  k1_n_threads,
+                                                                                  thread_reaction_rules)
+
+            # setup list of command line callable commands for the list of jobs (parallel simulations)
+            job_list = []
+            for thread in step_session_data.items():
+                run_data = self.convert_to_run_formats(thread)
+                nfsim_run_command = self.get_nfsim_run_command(run_data['dump_dir'],
+                                                               run_data['bngl_file'],
+                                                               run_data['xml_file'],
+                                                               run_data['dump_dir'], config.run_time)
+                job_list.append(nfsim_run_command)
+
+            # run simulations in parallel, or put the recorded dumps of a replayed session
+            if self.replay_bundle is not None:
+                self.replay_bundle.replay_step(run_step, step_session_data)
+            else:
+                self.parallel(delayed(run_simulation)(inputTuple) for inputTuple in job_list)
+
+            # make a pause until all simulations are done
+            self.wait_for_process(step_session_folder, alternative_n_threads)
+
+            # get all complexes formed by the threads of each region as a single bunch per region
+            region_complexes_attached, first_thread = [], 1
+            for region_thread_count in step_region_thread_counts:
+                region_threads = range(first_thread, first_thread + region_thread_count)
+                region_nucleotides = sum([len(c[0].split('.')) * c[1] for t in region_threads
+                                          for c in complexes_for_threads[t - 1]])
+                region_complexes_attached.append(self.attach_complexes({t: step_session_data[t]
+                                                                        for t in region_threads},
+                                                                       region_nucleotides))
+                first_thread += region_thread_count
+
+            # the dumps are recorded once completely written, i.e. all of them are decoded
+            if bundle_recorder is not None:
+                result_writer.submit(bundle_recorder.record_step, run_step, step_session_data)
+
+            # run post process, which is necessary to reduce identical complexes, regions are post processed
+            # in parallel
+            if len(region_complexes_attached) == 1:
+                region_species_sets = [complexes_post_process(region_complexes_attached[0], '', '', '')]
+            else:
+                region_species_sets = self.parallel(delayed(complexes_post_process)(c, '', '', '')
+                                                    for c in region_complexes_attached)
+
+            # apply the fast reactions to the decoded complexes
+            if config.fast_reaction_saturation:
+                region_species_sets = [saturate_species(r, saturation_cache) for r in region_species_sets]
+
+            # all complexes of the step, so this will be saved to a single file as the step's results
+            species_set = merge_species_sets(region_species_sets)
+
+            stop_reason = None
+            if equilibrium_monitor is not None and run_step < number_of_splits \
+                    and equilibrium_monitor.update(species_set):
+                stop_reason = 'equilibrium'
+
+            save_species_path = None
+            if run_step in result_steps or stop_reason is not None:
+                # results to save as species file name
+                save_species_file_name = '{}_(step-{})_(threads-{})_nf.{}_step_result.species{}'.format(
+                    self.input_species_file_name,
+                    run_step,
+                    alternative_n_threads,
+                    round(step_model_time, 6),
+                    compression_extensions[config.results_compression])
+                # make a path link to the file to be saved
+                save_species_path = os.path.join(step_session_folder, save_species_file_name)
+
+                # write results file at the relative step directory
+                result_writer.submit(write_species_file, save_species_path, species_set)
+
+            if trajectory_writer is not None:
+                result_writer.submit(trajectory_writer.write_step, run_step, step_model_time, species_set)
+
+            # record the early stop at the session directory, before the stop step is yielded
+            if stop_reason is not None:
+                with open(os.path.join(session_directory, 'early_stop.json'), 'w') as f:
+                    json.dump({'run_step': run_step,
+                               'model_time': step_model_time,
+                               'reason': stop_reason,
+                               'drift': equilibrium_monitor.drift,
+                               'equilibrium_window_steps': config.equilibrium_window_steps,
+                               'equilibrium_tolerance': config.equilibrium_tolerance,
+                               'equilibrium_measure': config.equilibrium_measure}, f, indent=1)
+
+            # species_file is None on steps not written, and may be still written on background when yielded
+            # stop_reason is given on the last step of a suite stopped early
+            yield {'session_directory': session_directory,
+                   'run_step': run_step,
+                   'number_of_splits': number_of_splits,
+                   'model_time': step_model_time,
+                   'threads': alternative_n_threads,
+                   'species_set': species_set,
+                   'species_file': save_species_path,
+                   'stop_reason': stop_reason}
+
+            if stop_reason is not None:
+                return
+
+    # number of threads of each region, for a global reshuffle step which fills n_threads threads
+    def get_region_thread_counts(self, n_threads):
+        region_size = self.config.region_size or n_threads
+
+        return [min(region_size, n_threads - t) for t in range(0, n_threads, region_size)]
+
+    # update k1 kinetic value on the bngl file to be used in each simulation step's thread
+    def get_bngl_parameters_k1_updated(self, n_threads):
+        if n_threads not in self.bngl_parameters_k1_updated:
+            self.bngl_parameters_k1_updated[n_threads] = ['k1 '
+                                                          + str(round((n_threads * self.config.k1_coefficient)
+                                                                      * float(p.split(' ')[1]), 6))
+                                                          if 'k1 ' in p else p for p in self.bngl_parameters]
+
+        return self.bngl_parameters_k1_updated[n_threads]
+
+    # number of threads for a step which can fill only possible_thread_count threads
+    # the fastest measured number of threads up to possible_thread_count, or possible_thread_count if not measured
+    def retune_thread_count(self, possible_thread_count):
+        measured = {int(n): t for n, t in self.config.thread_count_throughput.items() if int(n) <= possible_thread_count}
+        if not measured:
+            return possible_thread_count
+
+        return max(measured, key=measured.get)
+
+    # formulate NFSim simulation run command
+    def get_nfsim_run_command(self, current_step_folder, step_bngl_file, step_xml_file, result_dump_folder,
+                              thread_run_time):
+
+        # each thread of each step is given it's own seed, drawn from the random seed of the simulator
+        seed_option = ''
+        if self.config.random_seed is not None:
+            seed_option = '-seed {} '.format(self.random.randrange(1, 2 ** 31))
+
+        simulation_command = 'START CMD /C "CD "{}" && ' \
+                             '"{}" "{}" -xml "{}" && ' \
+                             '"{}" -utl 1000 {}-xml "{}" -dump "[0:{}:{}]-^>{}/" ' \
+                             '-oSteps 1 -sim {}"'.format(current_step_folder,
+                                                         convert_link_address(self.config.perl_interpreter),
+                                                         convert_link_address(self.config.nfsim_perl_interface),
+                                                         step_bngl_file,
+                                                         convert_link_address(self.config.nfsim_simulator),
+                                                         seed_option,
+                                                         step_xml_file, thread_run_time,
+                                                         thread_run_time,
+                                                         result_dump_folder,
+                                                         thread_run_time)
+
+        return simulation_command
+
+    # setup all session variables including bngl and xml files to relevant a dictionaries
+    # return the current step directory and the session dictionary of the step's threads
+    # thread_reaction_rules are the rules of each thread, all rules if not given
+    def setup_session_variables(self, session_directory, complexes_list_thread, n_runs, k1_n_threads,
+                                thread_reaction_rules=None):
+
+        # declare essential static bngl syntax
+        begin_molecule_syntax = ['begin molecule types\n',
+                                 '',
+                                 'end molecule types']
+
+        begin_species_syntax = ['begin species\n',
+                                '',
+                                'end species']
+
+        # current step/round directory of the simulation
+        current_step_directory = os.path.join(session_directory, 'step---{}'.format(n_runs))
+        os.mkdir(current_step_directory)
+
+        session_dictionary = {}
+
+        # loop through the complexes splits and include them in the bngl and save then in the relevant directory
+        for thread, complex, begin_molecule_state in zip(range(1, len(complexes_list_thread['complexes_all_split']) + 1),
+                                                         complexes_list_thread['complexes_all_split'],
+                                                         complexes_list_thread['begin_molecule_state']):
+
+            thread_data_directory = os.path.join(current_step_directory, 'thread---{}'.format(thread))
+            os.mkdir(thread_data_directory)
+
+            thread_bngl_file_name = '{}---{}---{}.bngl'.format(self.input_species_file_name, n_runs, thread)
+            thread_bngl = os.path.join(thread_data_directory, thread_bngl_file_name)
+            thread_xml_file_name = '{}---{}---{}.xml'.format(self.input_species_file_name, n_runs, thread)
+            thread_xml = os.path.join(thread_data_directory, thread_xml_file_name)
+
+            begin_molecule_syntax[1] = begin_molecule_state + '\n'
+            species_script = [begin_species_syntax[0], *complex, '\n', begin_species_syntax[-1]]
+
+            # formulate bngl file syntax
+            bngl_file_syntax = self.get_bngl_parameters_k1_updated(k1_n_threads) \
+                               + begin_molecule_syntax \
+                               + species_script \
+                               + self.bngl_observables \
+                               + self.bngl_functions \
+                               + (thread_reaction_rules[thread - 1] if thread_reaction_rules is not None
+                                  else self.bngl_reaction_rules)
+
+            write_file(thread_bngl, bngl_file_syntax)
+
+            session_dictionary.update({thread: {'thread_dir': thread_data_directory,
+                                                'thread_bngl': thread_bngl,
+                                                'thread_xml': thread_xml}})
+
+        return current_step_directory, session_dictionary
+
+    # fetch all complexes from the given simulated threads and attach them together
+    # the dumps' fg~ states are not decoded, so the complexes are the same for any fg state tagging
+    def attach_complexes(self, step_session_data, sum_nucleotides):
+        all_complexes_attached = []
+        n_nucleotides_fetched = 0
+
+        # read through the dumped files and keep fetching output data until all fetched
+        while sum_nucleotides != n_nucleotides_fetched:
+            all_complexes_attached = []
+            n_nucleotides_fetched = 0
+            for thread_dir in step_session_data.values():
+
+                dump_file_links = list(next(os.walk(thread_dir['thread_dir'])))
+                dump_file_link = os.path.join(dump_file_links[0],
+                                              str([i for i in dump_file_links[2]
+                                                   if is_result_dump(i)][0]))
+
+                species_list = convert_dump_to_species(dump_file_link, '', '', 'read_dump')
+
+                if type(species_list) == list:
+                    try:
+                        n_nucleotides_fetched += sum([len(i[0].split('.')) * int(i[1])
+                                                      for i in [[l.rsplit('  ', 1)[0], l.rsplit('  ', 1)[1]]
+                                                                for l in species_list]])
+                    except:
+                        pass
+
+                    for single_complex in species_list:
+                        all_complexes_attached.append(single_complex)
+
+        return all_complexes_attached
+
+    # split complexes to given number of baskets which are to be processed by parallel threads
+    def get_split_complexes(self, all_complexes, alternative_n_threads, kmer_index):
+        complex_index, complexes_dictionary, sum_of_nucleotides = [], {}, 0
+
+        # add index to all complexes and count their weight in (number of nucleotides per complex)
+        n = 1
+        for complex in all_complexes:
+            item = [int(complex[1]), len(complex[0].split('.')), n]
+            complex_index.append(item)
+            complexes_dictionary.update({n: complex[0]})
+            sum_of_nucleotides += item[0] * item[1]
+            n += 1
+
+        # reinitialize for sorting purpose
+        expanded = []
+        for c_index in complex_index:
+            for _ in range(c_index[0]):
+                expanded.append([c_index[2], c_index[1], 1])
+
+        # sort complexes by weight descending order and get n larger ones seperated (one per basket)
+        # then initialize the rest of them anf shuffle
+        baskets = {}
+        sorted_by_comp_size = list(reversed(sorted(expanded, key=lambda x: x[1])))
+        biggest_comps_per_n_thread = sorted_by_comp_size[:alternative_n_threads]
+        rest_of_comps = sorted_by_comp_size[alternative_n_threads:]
+
+        self.random.shuffle(rest_of_comps)
+
+        expanded_rearranged = biggest_comps_per_n_thread + rest_of_comps
+
+        for thread in range(1, alternative_n_threads + 1):
+            baskets.update({thread: [[], []]})
+
+        # put available complexes to baskets. put the upcoming complex on a loop to the smallest basket by weight basis
+        # or, if complementarity partitioning is on, to the basket holding most of its binding partners
+        # among the baskets which stay within the balance tolerance, a basket fits if it stays below the upper
+        # limit and the complexes left can still fill all baskets up to the lower limit
+        total_weight = 0
+        current_basket = 1
+        basket_kmers = {thread: Counter() for thread in baskets}
+        basket_weight_limit = (1 + self.config.partition_balance_tolerance) \
+                              * sum_of_nucleotides / alternative_n_threads
+        basket_weight_minimum = (1 - self.config.partition_balance_tolerance) \
+                                * sum_of_nucleotides / alternative_n_threads
+        for complex_e_r in expanded_rearranged:
+            basket_sizes = {i[0]: sum(i[1][1]) for i in baskets.items()}
+
+            if self.config.complementarity_partitioning:
+                complex_kmers = kmer_index[complexes_dictionary[complex_e_r[0]]]
+
+                # weight left after the complex, and weight the baskets lack of the lower limit
+                weight_left = sum_of_nucleotides - total_weight - complex_e_r[1]
+                weight_lacking = sum([max(basket_weight_minimum - w, 0) for w in basket_sizes.values()])
+
+                fitting_baskets = [b for b in basket_sizes if basket_sizes[b] + complex_e_r[1] <= basket_weight_limit
+                                   and weight_left >= weight_lacking - max(basket_weight_minimum - basket_sizes[b], 0)
+                                   + max(basket_weight_minimum - basket_sizes[b] - complex_e_r[1], 0)]
+                if fitting_baskets:
+                    current_basket = max(fitting_baskets,
+                                         key=lambda b: (binding_affinity(complex_kmers, basket_kmers[b]),
+                                                        -basket_sizes[b]))
+                else:
+                    current_basket = min(basket_sizes, key=basket_sizes.get)
+                basket_kmers[current_basket].update(complex_kmers)
+            else:
+                current_basket = min(basket_sizes, key=basket_sizes.get)
+
+            baskets[current_basket][0].append(complex_e_r[0])
+            baskets[current_basket][1].append(complex_e_r[1])
+            total_weight += complex_e_r[1]
+
+        # check the minimum possible threads to be utilized on the next split/round
+        possible_thread_count = sum([1 for i in baskets.items() if i[1] != [[], []]])
+
+        complexes_for_threads = []
+        for b_item in baskets.items():
+            if b_item[1] != [[], []]:
+                get_count = Counter(b_item[1][0])
+                item_set = [[complexes_dictionary[f[0]], f[1]] for f in get_count.items()]
+                complexes_for_threads.append(item_set)
+
+        return {'complexes_for_threads': complexes_for_threads,
+                'possible_thread_count': possible_thread_count}
+
+    # convert file links to command line acceptable format
+    def convert_to_run_formats(self, thread_data):
+
+        bngl_file = convert_link_address(thread_data[1]['thread_bngl'])
+        xml_file = convert_link_address(thread_data[1]['thread_xml'])
+        dump_dir = convert_link_address(thread_data[1]['thread_dir'])
+
+        run_d_dic = {'bngl_file': bngl_file,
+                     'xml_file': xml_file,
+                     'dump_dir': dump_dir}
+
+        return run_d_dic
+
+    # pause program until simulation processes in parallel are finished, return true when done
+    def wait_for_process(self, current_session_folder, n_threads):
+        check_items_directory = {}
+
+        # loop through and check if the results dumps are created at each thread's directory
+        while sum([i for i in check_items_directory.values()]) != n_threads:
+            dump_p = list(os.walk(current_session_folder))[1:]
+            dump_f = list(os.walk(current_session_folder))[0][1]
+
+            for d, f in zip(dump_p, dump_f):
+
+                check_dump = len([i for i in d[2] if is_result_dump(i)])
+
+                if check_dump != 0:
+                    if f not in check_items_directory:
+                        check_items_directory.update({f: check_dump})
+
+        return True
+
+    # set fg~ state to species complexes
+    # the reaction rules bind and release the fg site but never test it's state, so a single fg~0 state
+    # ("constant") keeps the molecule type the same for any basket size, "per_complex" gives each complex
+    # of a basket it's own state, of which number grows with the basket
+    def complexes_set_fg_state(self, all_complexes):
+
+        comps_and_bngl_info = {'complexes_all_split': [], 'begin_molecule_state': []}
+        per_complex = self.config.fg_state_tagging == 'per_complex'
+
+        for complex in all_complexes:
+
+            comps_with_state, begin_mol_line = [], 'N(b~A~T~C~G,5,3,W,fg'
+            for ssdna, c_len in zip(complex, range(0, len(complex))):
+                fg_state = c_len if per_complex else 0
+                ssdna_with_state = '.'.join(['{},fg~{})'.format(nuc[:-1], fg_state)
+                                             for nuc in ssdna[0].split('.')]) + '  ' + str(ssdna[1])
+
+                comps_with_state.append(ssdna_with_state)
+                if per_complex:
+                    begin_mol_line += '~' + str(c_len)
+
+            comps_and_bngl_info['complexes_all_split'].append(comps_with_state)
+            comps_and_bngl_info['begin_molecule_state'].append(begin_mol_line + ('' if per_complex else '~0') + ')')
+
+        return comps_and_bngl_info
+
+
+# merge post processed species sets of the regions, identical complexes share the same canonical syntax
+def merge_species_sets(species_sets):
+    if len(species_sets) == 1:
+        return species_sets[0]
+
+    merged = Counter()
+    for species_set in species_sets:
+        for complex in species_set:
+            merged[complex[0]] += int(complex[1])
+
+    return [[c, str(n)] for c, n in merged.items()]
+
+
+# write post processed complexes to a file on species standard format
+# the file is renamed to it's final name when completely written, so readers never see a partial step result
+def write_species_file(save_species_path, species_set):
+    complexes_list_st_format = [''.join(['# ' + ''.join([c[4] for c in e[0].split('.')]) + ", 5' - 3'\n",
+                                         str(e[0] + '  ' + e[1])]) + '\n' for e in species_set]
+
+    partial_species_path = save_species_path.replace('_step_result.species', '_step_result.part.species')
+    write_file(partial_species_path, complexes_list_st_format)
+    os.replace(partial_species_path, save_species_path)
+
+
+# run simulation by call with command
+def run_simulation(cmd_command):
+    os.system(cmd_command)
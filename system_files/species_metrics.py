@@ -0,0 +1,73 @@
+from collections import Counter
+
+
+# number of copies of each canonical (post processed) complex of species sets, pooled over the given sets
+def complex_distribution(species_sets):
+    distribution = Counter()
+    for species_set in species_sets:
+        for complex in species_set:
+            distribution[complex[0]] += int(complex[1])
+
+    return distribution
+
+
+# total variation distance of two complex distributions, from 0 (identical) to 1 (disjoint)
+def total_variation_distance(distribution_a, distribution_b):
+    total_a, total_b = sum(distribution_a.values()), sum(distribution_b.values())
+    if total_a == 0 or total_b == 0:
+        return float(total_a != total_b)
+
+    return 0.5 * sum([abs(distribution_a[c] / total_a - distribution_b[c] / total_b)
+                      for c in set(distribution_a) | set(distribution_b)])
+
+
+# fraction of nucleotides bound to a complementary base
+def bound_fraction(distribution):
+    n_nucleotides = sum([c.count('N(') * n for c, n in distribution.items()])
+    n_bound = sum([c.count(',W!') * n for c, n in distribution.items()])
+
+    return n_bound / n_nucleotides if n_nucleotides else 0.0
+
+
+# mean number of strands per complex
+def mean_complex_size(distribution):
+    n_complexes = sum(distribution.values())
+    n_strands = sum([c.count(',5,') * n for c, n in distribution.items()])
+
+    return n_strands / n_complexes if n_complexes else 0.0
+
+
+# number of complexes of each size in strands
+def complex_size_distribution(distribution):
+    sizes = Counter()
+    for c, n in distribution.items():
+        sizes[c.count(',5,')] += n
+
+    return sizes
+
+
+# earth mover's (1-Wasserstein) distance of two complex size distributions, in strands
+def wasserstein_distance(sizes_a, sizes_b):
+    total_a, total_b = sum(sizes_a.values()), sum(sizes_b.values())
+    if total_a == 0 or total_b == 0:
+        return 0.0
+
+    distance, cumulative_a, cumulative_b = 0.0, 0.0, 0.0
+    sizes = sorted(set(sizes_a) | set(sizes_b))
+    for size, next_size in zip(sizes, sizes[1:]):
+        cumulative_a += sizes_a[size] / total_a
+        cumulative_b += sizes_b[size] / total_b
+        distance += abs(cumulative_a - cumulative_b) * (next_size - size)
+
+    return distance
+
+
+# counterparts of the observables at observables.bngl, per copy of a species set pooled in the distribution
+def species_observables(distribution, n_species_sets):
+    n_nucleotides = sum([c.count('N(') * n for c, n in distribution.items()])
+    n_bound = sum([c.count(',W!') * n for c, n in distribution.items()])
+
+    return {'N_Bound': n_bound / n_species_sets,
+            'N_notBound': (n_nucleotides - n_bound) / n_species_sets,
+            'Nr_complexes': sum(distribution.values()) / n_species_sets,
+            'Nr_strands': sum([c.count(',5,') * n for c, n in distribution.items()]) / n_species_sets}
@@ -0,0 +1,131 @@
+import os
+from struct import pack, unpack, calcsize
+
+# step header: step, model time, number of records, keyframe flag
+step_header = '<IdIB'
+# record: complex id, count on keyframes or count delta from the previous step
+step_record = '<Ii'
+
+complexes_file_name = 'complexes.txt'
+steps_file_name = 'steps.dat'
+
+
+# delta encoded trajectory of a session's step results
+# complexes.txt is an append only dictionary of canonical (post processed) complexes, a line per complex id
+# steps.dat holds each step as (complex id, count delta) records, with a full keyframe every keyframe_interval steps
+class TrajectoryWriter:
+
+    def __init__(self, directory, keyframe_interval=50):
+        self.directory = directory
+        self.keyframe_interval = keyframe_interval
+        self.complex_ids = {}
+        self.previous_counts = {}
+        self.n_steps = 0
+
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, complexes_file_name), 'w').close()
+        open(os.path.join(directory, steps_file_name), 'wb').close()
+
+    # append a step's post processed species set, e.g. [['N(b~A,5,3!1,W).N(b~T,5!1,3,W)', '10'], ...]
+    def write_step(self, step, model_time, species_set):
+        new_complexes, counts = [], {}
+        for complex in species_set:
+            if complex[0] not in self.complex_ids:
+                self.complex_ids[complex[0]] = len(self.complex_ids)
+                new_complexes.append(complex[0])
+            complex_id = self.complex_ids[complex[0]]
+            counts[complex_id] = counts.get(complex_id, 0) + int(complex[1])
+
+        keyframe = self.n_steps % self.keyframe_interval == 0
+        if keyframe:
+            records = sorted(counts.items())
+        else:
+            records = sorted([(i, counts.get(i, 0) - self.previous_counts.get(i, 0))
+                              for i in set(counts) | set(self.previous_counts)
+                              if counts.get(i, 0) != self.previous_counts.get(i, 0)])
+
+        with open(os.path.join(self.directory, complexes_file_name), 'a') as f:
+            for complex in new_complexes:
+                f.write("%s" % complex + '\n')
+
+        # the complexes of a step are written before it, and the step in a single write
+        with open(os.path.join(self.directory, steps_file_name), 'ab') as f:
+            f.write(pack(step_header, step, model_time, len(records), keyframe)
+                    + b''.join([pack(step_record, i, c) for i, c in records]))
+
+        self.previous_counts = counts
+        self.n_steps += 1
+
+
+# rebuild any step's species of a trajectory written by TrajectoryWriter
+# the trajectory may be read while it is written, a step still being written at the end of steps.dat is left out
+class TrajectoryReader:
+
+    def __init__(self, directory):
+        # steps are read first, as the complexes of a step are written before it
+        with open(os.path.join(directory, steps_file_name), 'rb') as f:
+            self.data = f.read()
+
+        with open(os.path.join(directory, complexes_file_name), 'r') as f:
+            self.complexes = [l.rstrip('\n') for l in f]
+
+        # index the steps as [step, model time, keyframe, offset of the first record, number of records]
+        self.index, offset = [], 0
+        while offset + calcsize(step_header) <= len(self.data):
+            step, model_time, n_records, keyframe = unpack(step_header,
+                                                           self.data[offset:offset + calcsize(step_header)])
+            if offset + calcsize(step_header) + n_records * calcsize(step_record) > len(self.data):
+                break
+
+            offset += calcsize(step_header)
+            self.index.append([step, model_time, bool(keyframe), offset, n_records])
+            offset += n_records * calcsize(step_record)
+
+        self.positions = {i[0]: p for p, i in enumerate(self.index)}
+
+    # list of the recorded steps
+    def steps(self):
+        return [i[0] for i in self.index]
+
+    # model time of a recorded step
+    def model_time(self, step):
+        return self.index[self.positions[step]][1]
+
+    def records(self, position):
+        offset, n_records = self.index[position][3], self.index[position][4]
+        size = calcsize(step_record)
+
+        return [unpack(step_record, self.data[offset + i * size:offset + i * size + size]) for i in range(n_records)]
+
+    def apply(self, counts, position):
+        if self.index[position][2]:
+            counts.clear()
+
+        for complex_id, count in self.records(position):
+            counts[complex_id] = counts.get(complex_id, 0) + count
+            if counts[complex_id] == 0:
+                del counts[complex_id]
+
+        return counts
+
+    # complex id to count of a step, rebuilt from the last keyframe before it
+    def counts_at(self, step):
+        position = self.positions[step]
+        keyframe = max([p for p in range(0, position + 1) if self.index[p][2]])
+
+        counts = {}
+        for p in range(keyframe, position + 1):
+            self.apply(counts, p)
+
+        return counts
+
+    # species set of a step, e.g. [['N(b~A,5,3!1,W).N(b~T,5!1,3,W)', '10'], ...]
+    def species_at(self, step):
+        return [[self.complexes[i], str(c)] for i, c in sorted(self.counts_at(step).items())]
+
+    # yield (step, model time, species set) of all steps in order, for loading a whole run
+    def iter_species(self):
+        counts = {}
+        for p, i in enumerate(self.index):
+            self.apply(counts, p)
+            yield i[0], i[1], [[self.complexes[c], str(n)] for c, n in sorted(counts.items())]
@@ -0,0 +1,126 @@
+import argparse
+import tempfile
+from shutil import rmtree
+from datetime import datetime
+from dataclasses import replace
+from system_files.simulation_config import SimulationConfig
+from system_files.simulator import Simulator
+from system_files.species_metrics import (complex_distribution,
+                                          total_variation_distance,
+                                          complex_size_distribution,
+                                          wasserstein_distance,
+                                          species_observables)
+
+
+# run a test suite of the config for each seed (None for an unseeded suite), return each step's species sets
+# of all suites, the model time of each step and the wall time of each suite in seconds
+def run_suites(config, seeds):
+    step_species, model_times, wall_times = {}, {}, []
+
+    for seed in seeds:
+        time_start = datetime.now()
+        for step_result in Simulator(replace(config, random_seed=seed)).iter_steps():
+            step_species.setdefault(step_result['run_step'], []).append(step_result['species_set'])
+            model_times[step_result['run_step']] = step_result['model_time']
+        wall_times.append((datetime.now() - time_start).total_seconds())
+
+    return step_species, model_times, wall_times
+
+
+# distances of the candidate's pooled step results from the reference's, per step
+def compare_steps(reference_steps, candidate_steps):
+    comparison = []
+    for run_step in sorted(reference_steps):
+        reference = complex_distribution(reference_steps[run_step])
+        candidate = complex_distribution(candidate_steps[run_step])
+        reference_observables = species_observables(reference, len(reference_steps[run_step]))
+        candidate_observables = species_observables(candidate, len(candidate_steps[run_step]))
+
+        comparison.append({'total_variation_distance': total_variation_distance(reference, candidate),
+                           'wasserstein_distance': wasserstein_distance(complex_size_distribution(reference),
+                                                                        complex_size_distribution(candidate)),
+                           'observables_error': {o: abs(candidate_observables[o] - v) / v if v else 0.0
+                                                 for o, v in reference_observables.items()}})
+
+    return comparison
+
+
+# run the input undistributed (a single thread, k1 not scaled) and with each number of threads over the same seeds,
+# and measure speed-up against the distance of the complex distributions and observables from the reference
+# other modes of the config (partitioning, regions, saturation...) are kept for the distributed runs
+def validate(config, thread_counts, seeds, progress_callback=None):
+    check_directory = tempfile.mkdtemp(prefix='validation---', dir=config.save_results_directory)
+
+    # step results are compared in memory, only the final step is written
+    # all steps are run, so the steps of the runs can be compared
+    config = replace(config, save_results_directory=check_directory, save_trajectory=False,
+                     write_results_at_model_times=[], write_results_every_n_steps=config.number_of_splits,
+                     equilibrium_detection=False, record_replay_bundle=False, replay_bundle=None)
+    reference_config = replace(config, number_of_parallel_threads=1, k1_coefficient=1.0, region_size=0,
+                               global_reshuffle_every_n_steps=1, adaptive_thread_count=False,
+                               complementarity_partitioning=False, fast_reaction_saturation=False)
+
+    rows = []
+    try:
+        reference_steps, _, reference_wall_times = run_suites(reference_config, seeds)
+        reference_wall_time = sum(reference_wall_times) / len(seeds)
+
+        # distance of the two halves of the reference seeds, the noise of the metrics with this number of seeds
+        noise_floor = None
+        if len(seeds) > 1:
+            half = len(seeds) // 2
+            final_step = max(reference_steps)
+            noise_floor = total_variation_distance(complex_distribution(reference_steps[final_step][:half]),
+                                                   complex_distribution(reference_steps[final_step][half:]))
+
+        for n_threads in thread_counts:
+            candidate_steps, _, wall_times = run_suites(replace(config, number_of_parallel_threads=n_threads),
+                                                        seeds)
+            wall_time = sum(wall_times) / len(seeds)
+            comparison = compare_steps(reference_steps, candidate_steps)
+
+            row = {'number_of_parallel_threads': n_threads,
+                   'wall_time': wall_time,
+                   'speed_up': reference_wall_time / wall_time,
+                   'final_total_variation_distance': comparison[-1]['total_variation_distance'],
+                   'max_total_variation_distance': max([c['total_variation_distance'] for c in comparison]),
+                   'final_wasserstein_distance': comparison[-1]['wasserstein_distance'],
+                   'final_observables_error': comparison[-1]['observables_error'],
+                   'noise_floor': noise_floor}
+            rows.append(row)
+
+            if progress_callback is not None:
+                progress_callback(row)
+    finally:
+        rmtree(check_directory, ignore_errors=True)
+
+    return {'reference_wall_time': reference_wall_time, 'rows': rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure speed-up and error of distributed runs against '
+                                                 'an undistributed reference.')
+    parser.add_argument('parameters_file', nargs='?', default='simulation_parameters.json')
+    parser.add_argument('--threads', type=int, nargs='+', default=[2, 4, 8],
+                        help='numbers of threads to validate, default 2 4 8')
+    parser.add_argument('--seeds', type=int, default=5, help='number of seeds per run, default 5')
+    args = parser.parse_args()
+
+    validation = validate(SimulationConfig.from_json(args.parameters_file), args.threads,
+                          list(range(1, args.seeds + 1)))
+
+    print('reference (1 thread, k1 not scaled): {:.1f} s per suite'.format(validation['reference_wall_time']))
+    print('threads  wall time  speed-up  TV final  TV max  W1 final  N_Bound error  Nr_complexes error')
+    for row in validation['rows']:
+        print('{}  {:.1f} s  {:.2f}  {:.4f}  {:.4f}  {:.3f}  {:.2%}  {:.2%}'.format(
+            row['number_of_parallel_threads'], row['wall_time'], row['speed_up'],
+            row['final_total_variation_distance'], row['max_total_variation_distance'],
+            row['final_wasserstein_distance'], row['final_observables_error']['N_Bound'],
+            row['final_observables_error']['Nr_complexes']))
+
+    if validation['rows'] and validation['rows'][0]['noise_floor'] is not None:
+        print('TV noise floor of the reference seeds: {:.4f}'.format(validation['rows'][0]['noise_floor']))
+
+
+if __name__ == '__main__':
+    main()